@@ -1,42 +1,58 @@
-import os
+import importlib.util
 import json
-import re
-from flask import Flask, render_template, request, jsonify
+import os
+import threading
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
 from flask_cors import CORS
 
-# Optional integrations (openai, sympy). Keep optional to avoid breaking environments without them.
-try:
-    import openai
-except Exception:
-    openai = None
-
-try:
-    import sympy as sp
-except Exception:
-    sp = None
+import scoring
+from assets import AssetManifest
+from cache import ResponseCache
+from router import IntentRouter
+from solver import SolverBusy, SolverPool, SolverTimeout, symbolic_router
+from storage import PlanStore, SessionStore, decode_cursor, encode_cursor, is_plan_id
+
+# Optional integrations (LLM, sympy). Keep optional to avoid breaking environments without them.
+# Neither is imported at module load: SymPy is only ever imported inside the
+# solver pool's worker processes, and the LLM client on the first LLM
+# request, so workers that never serve those requests don't pay for them.
+SYMPY_AVAILABLE = importlib.util.find_spec('sympy') is not None
+
+_llm = None
+_llm_lock = threading.Lock()
+
+
+def get_llm():
+    """The worker's shared LLM client, or None if no API key is set or requests is missing."""
+    global _llm
+    if _llm is None and os.environ.get('OPENAI_API_KEY'):
+        with _llm_lock:
+            if _llm is None:
+                try:
+                    from llm import LLMClient
+                except Exception:
+                    return None
+                _llm = LLMClient(
+                    api_key=os.environ['OPENAI_API_KEY'],
+                    base_url=os.environ.get('OPENAI_API_BASE', 'https://api.openai.com/v1'),
+                    model=os.environ.get('OPENAI_MODEL', 'gpt-3.5-turbo'),
+                    timeout=float(os.environ.get('JAS_LLM_TIMEOUT', 30)),
+                    max_in_flight=int(os.environ.get('JAS_LLM_MAX_IN_FLIGHT', 8)),
+                    pool_size=int(os.environ.get('JAS_LLM_POOL_SIZE', 10)),
+                )
+    return _llm
 
 app = Flask(__name__, template_folder='templates', static_folder='static')
 CORS(app)
 
+# Fingerprinted, immutable-cached URLs for static files (asset_url() in templates).
+assets = AssetManifest(app.static_folder, auto_reload=os.environ.get('FLASK_DEBUG') == '1')
+assets.init_app(app)
+
 PLANS_FILE = "study_plans.json"
 
-def load_plans():
-    try:
-        if os.path.exists(PLANS_FILE):
-            with open(PLANS_FILE, "r") as f:
-                data = json.load(f)
-                return data if isinstance(data, list) else []
-    except:
-        pass
-    return []
-
-def save_plans(plans):
-    try:
-        with open(PLANS_FILE, "w") as f:
-            json.dump(plans, f, indent=2)
-        return True
-    except:
-        return False
+plan_store = PlanStore(PLANS_FILE)
+PLANS_MAX_PAGE_SIZE = 500
 
 @app.route("/")
 def home():
@@ -56,27 +72,109 @@ def calculate():
         if not data or "hours" not in data:
             return jsonify({"error": "Missing hours"}), 400
         
-        hours = float(data["hours"])
-        focus = min((hours / 16) * 100, 100)
-
-        if hours < 6:
-            tip = "Low consistency. Try focused short sessions."
-        elif hours <= 12:
-            tip = "Balanced study detected. Maintain breaks."
-        else:
-            tip = "Overstudy detected. AI recommends rest."
-
-        return jsonify({
-            "hours": hours,
-            "focus": round(focus, 2),
-            "tip": tip
-        })
+        return jsonify(scoring.score(data["hours"]))
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
+@app.route("/calculate/batch", methods=["POST"])
+def calculate_batch():
+    """Score many hours values in one request, streamed back as NDJSON.
+
+    The body is a JSON array (of numbers or {"id", "hours"} objects), NDJSON
+    with one such value per line, or CSV with an hours column. CSV and NDJSON
+    bodies are read as they arrive, so a cohort-sized upload is never held
+    in memory. Each output line carries the input's index (and id, if given).
+    """
+    mimetype = request.mimetype
+    if mimetype == "application/json":
+        data = request.get_json(silent=True)
+        if not isinstance(data, list):
+            return jsonify({"error": "Expected a JSON array"}), 400
+        records = scoring.json_records(data)
+    elif mimetype in ("application/x-ndjson", "application/jsonl", "application/ndjson"):
+        records = scoring.ndjson_records(scoring.text_lines(request.stream))
+    elif mimetype == "text/csv":
+        records = scoring.csv_records(scoring.text_lines(request.stream))
+    else:
+        return jsonify({"error": "Send application/json, application/x-ndjson or text/csv"}), 415
+
+    return Response(stream_with_context(scoring.score_records(records)),
+                    mimetype="application/x-ndjson")
+
 @app.route("/api/plans", methods=["GET"])
 def get_plans():
-    return jsonify(load_plans())
+    """All plans, or a filtered page when any query parameter is given.
+
+    Filters: from/to (inclusive dates), subject, completed (true/false),
+    limit and cursor. Filtered results are ordered by (date, id); when more
+    remain, the cursor for the next page is sent in ``X-Next-Cursor``.
+
+    Responses carry the store revision as their ETag and in
+    ``X-Plans-Revision``; a matching If-None-Match gets a bodyless 304.
+    """
+    # Read the revision before the data: if a write lands in between, the
+    # body is newer than its tag and the client just refetches later.
+    revision = plan_store.revision()
+    etag = f"r{revision}"
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = plans_response(request.args)
+        if response.status_code != 200:
+            return response
+    response.set_etag(etag)
+    response.headers["X-Plans-Revision"] = str(revision)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+def plans_response(args):
+    if not args:
+        return jsonify(plan_store.all())
+
+    try:
+        completed = args.get("completed")
+        if completed is not None:
+            if completed.lower() not in ("true", "false", "1", "0"):
+                raise ValueError("completed must be true or false")
+            completed = completed.lower() in ("true", "1")
+        limit = args.get("limit")
+        if limit is not None:
+            if not limit.isdecimal() or int(limit) < 1:
+                raise ValueError("limit must be a positive integer")
+            limit = min(int(limit), PLANS_MAX_PAGE_SIZE)
+        cursor = args.get("cursor")
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        response = jsonify({"success": False, "error": str(e)})
+        response.status_code = 400
+        return response
+
+    plans, more = plan_store.query(
+        date_from=args.get("from"), date_to=args.get("to"),
+        subject=args.get("subject"), completed=completed,
+        limit=limit, after=after,
+    )
+    response = jsonify(plans)
+    if more:
+        last = plans[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(str(last.get("date") or ""), last["id"])
+    return response
+
+@app.route("/api/plans/changes", methods=["GET"])
+def get_plan_changes():
+    """Plans inserted, updated or deleted after revision ``since``."""
+    since = request.args.get("since", type=int)
+    if since is None:
+        return jsonify({"success": False, "error": "Missing or invalid since"}), 400
+    return jsonify(plan_store.changes(since))
+
+def new_plan(data):
+    return {
+        "subject": data.get("subject", ""),
+        "hours": float(data.get("hours", 0)),
+        "date": data.get("date", ""),
+        "completed": False
+    }
 
 @app.route("/api/plans", methods=["POST"])
 def add_plan():
@@ -85,16 +183,8 @@ def add_plan():
         if not data:
             return jsonify({"success": False, "error": "No data"}), 400
         
-        plans = load_plans()
-        plans.append({
-            "id": len(plans),
-            "subject": data.get("subject", ""),
-            "hours": float(data.get("hours", 0)),
-            "date": data.get("date", ""),
-            "completed": False
-        })
-        save_plans(plans)
-        return jsonify({"success": True})
+        plan = plan_store.add(new_plan(data))
+        return jsonify({"success": True, "plan": plan})
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 400
 
@@ -102,177 +192,237 @@ def add_plan():
 def update_plan(plan_id):
     try:
         data = request.get_json()
-        plans = load_plans()
         
-        if plan_id < 0 or plan_id >= len(plans):
+        plan = plan_store.update(plan_id, data)
+        if plan is None:
             return jsonify({"success": False, "error": "Plan not found"}), 404
         
-        plans[plan_id].update(data)
-        save_plans(plans)
-        return jsonify({"success": True})
+        return jsonify({"success": True, "plan": plan})
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 400
 
 @app.route("/api/plans/<int:plan_id>", methods=["DELETE"])
 def delete_plan(plan_id):
     try:
-        plans = load_plans()
-        
-        if plan_id < 0 or plan_id >= len(plans):
+        if not plan_store.delete(plan_id):
             return jsonify({"success": False, "error": "Plan not found"}), 404
         
-        plans.pop(plan_id)
-        save_plans(plans)
         return jsonify({"success": True})
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 400
 
-# ---------------- Jas AI endpoint ----------------
-SESSIONS_FILE = 'jas_sessions.json'
+@app.route("/api/plans/batch", methods=["POST"])
+def batch_plans():
+    """Apply arrays of creates, updates and deletes in one storage write.
 
-def load_sessions():
+    Body: {"create": [plan, ...], "update": [{"id": n, ...fields}, ...],
+    "delete": [id, ...]}. Each item gets its own result, in input order.
+    """
     try:
-        if os.path.exists(SESSIONS_FILE):
-            with open(SESSIONS_FILE, 'r') as f:
-                return json.load(f) or {}
-    except Exception:
-        pass
-    return {}
-
+        data = request.get_json()
+        if not isinstance(data, dict):
+            return jsonify({"success": False, "error": "No data"}), 400
 
-def save_sessions(sessions):
-    try:
-        with open(SESSIONS_FILE, 'w') as f:
-            json.dump(sessions, f, indent=2)
-        return True
-    except Exception:
-        return False
+        results = {"create": [], "update": [], "delete": []}
 
+        creates, create_slots = [], []
+        for item in data.get("create") or []:
+            try:
+                creates.append(new_plan(item))
+                create_slots.append(len(results["create"]))
+                results["create"].append(None)
+            except Exception as e:
+                results["create"].append({"success": False, "error": str(e)})
+
+        updates, update_slots = [], []
+        for item in data.get("update") or []:
+            if not isinstance(item, dict) or not is_plan_id(item.get("id")):
+                results["update"].append({"success": False, "error": "Update needs an integer id"})
+                continue
+            updates.append((item["id"], item))
+            update_slots.append(len(results["update"]))
+            results["update"].append(None)
+
+        deletes, delete_slots = [], []
+        for plan_id in data.get("delete") or []:
+            if not is_plan_id(plan_id):
+                results["delete"].append({"success": False, "error": "Delete needs an integer id"})
+                continue
+            deletes.append(plan_id)
+            delete_slots.append(len(results["delete"]))
+            results["delete"].append(None)
+
+        applied = plan_store.apply_batch(creates, updates, deletes)
+
+        for slot, plan in zip(create_slots, applied["create"]):
+            results["create"][slot] = {"success": True, "id": plan["id"]}
+        for slot, (plan_id, _), ok in zip(update_slots, updates, applied["update"]):
+            results["update"][slot] = {"success": True, "id": plan_id} if ok else \
+                {"success": False, "id": plan_id, "error": "Plan not found"}
+        for slot, plan_id, ok in zip(delete_slots, deletes, applied["delete"]):
+            results["delete"][slot] = {"success": True, "id": plan_id} if ok else \
+                {"success": False, "id": plan_id, "error": "Plan not found"}
+
+        return jsonify({"success": True, "results": results})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 400
 
-def store_session_message(session_id, role, text):
+# ---------------- Jas AI endpoint ----------------
+SESSIONS_FILE = 'jas_sessions.json'
+SESSIONS_DIR = 'jas_sessions'
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 500
+
+# Retention: 0 disables a limit. Ages are in days, cold_after in hours.
+session_store = SessionStore(
+    SESSIONS_DIR,
+    max_messages=int(os.environ.get('JAS_HISTORY_MAX_MESSAGES', 2000)) or None,
+    max_age=float(os.environ.get('JAS_HISTORY_MAX_AGE_DAYS', 180)) * 86400 or None,
+    cold_after=float(os.environ.get('JAS_HISTORY_COLD_AFTER_HOURS', 24)) * 3600 or None,
+    compact_interval=float(os.environ.get('JAS_HISTORY_COMPACT_INTERVAL', 300)),
+)
+session_store.import_legacy(SESSIONS_FILE)
+
+solver_pool = SolverPool(
+    workers=int(os.environ.get('JAS_SOLVER_WORKERS', 2)),
+    timeout=float(os.environ.get('JAS_SOLVER_TIMEOUT', 5)),
+    max_queue=int(os.environ.get('JAS_SOLVER_MAX_QUEUE', 8)),
+    cache_options={
+        'max_size': int(os.environ.get('JAS_SOLVER_CACHE_SIZE', 2048)),
+        'ttl': float(os.environ.get('JAS_SOLVER_CACHE_TTL', 86400)),
+        'path': os.environ.get('JAS_SOLVER_CACHE_PATH') or None,
+    },
+)
+
+
+def store_exchange(session_id, message, reply):
+    """Persist a user message and Jas's reply together in one write."""
     if not session_id:
         return
-    sessions = load_sessions()
-    messages = sessions.get(session_id, [])
-    messages.append({'role': role, 'text': text})
-    sessions[session_id] = messages
-    save_sessions(sessions)
+    session_store.append(session_id, [
+        {'role': 'user', 'text': message},
+        {'role': 'bot', 'text': reply},
+    ])
+
+
+# Replies keyed by (mode, message, model). Near-duplicate matching is opt-in
+# (JAS_RESPONSE_CACHE_FUZZY=1) and only used for LLM answers; rule-based
+# replies quote the question verbatim.
+_cache_modes = os.environ.get('JAS_RESPONSE_CACHE_MODES', '*')
+response_cache = ResponseCache(
+    max_size=int(os.environ.get('JAS_RESPONSE_CACHE_SIZE', 4096)),
+    ttl=float(os.environ.get('JAS_RESPONSE_CACHE_TTL', 3600)),
+    modes=None if _cache_modes == '*' else [m.strip() for m in _cache_modes.split(',') if m.strip()],
+    fuzzy=os.environ.get('JAS_RESPONSE_CACHE_FUZZY', '0') == '1',
+)
+
+JAS_SYSTEM_PROMPT = (
+    "You are Jas AI, an expert concise study assistant for students. "
+    "Be helpful and provide step-by-step answers for doubts. Keep replies short and actionable.")
+LLM_PARAMS = {'max_tokens': 600, 'temperature': 0.2}
+
+
+def doubt_reply(message):
+    """Doubt mode: try to resolve symbolically with SymPy. Returns (reply, status)."""
+    if symbolic_router.match(message):
+        try:
+            reply = solver_pool.solve(message)
+        except SolverBusy:
+            return ("Jas AI is busy solving other problems right now. "
+                    "Please try again in a few seconds."), 503
+        except SolverTimeout:
+            return ("That one is taking too long to solve symbolically. "
+                    "Try simplifying the expression or splitting it into smaller steps."), 200
+
+        if reply:
+            return reply, 200
+
+    # Fallback doubt message
+    return (f"Doubt Solver — I saw your question: '{message}'.\n\n"
+            "1) Restate the problem to ensure understanding.\n"
+            "2) Break it into smaller steps and show attempted work.\n"
+            "3) If it's numeric, share values and units.\n\n"
+            "If you paste the specific question or your attempt, I can provide a step-by-step solution."), 200
+
+
+# Local replies by mode. New modes plug in with ``@jas_router.register``;
+# messages no route answers get the general reply.
+jas_router = IntentRouter()
+
+
+@jas_router.register('pcm_plan', modes={'pcm'})
+def pcm_plan_reply(message):
+    return (
+        f"PCM Study Plan based on: '{message}'\n\n"
+        "1) Core Concept Review: 45-60 mins focusing on theory and formulas.\n"
+        "2) Practice: 30-45 mins solving 10 focused problems.\n"
+        "3) Recall: 15 mins flashcards for key facts.\n"
+        "4) Weekly Mock: 1 timed paper every 7 days.\n\n"
+        "Tip: Rotate Physics/Chemistry/Math in blocks and review mistakes the same day.")
+
+
+def general_reply(message):
+    return (
+        f"Hello! I'm Jas AI. You asked: '{message}'\n\n"
+        "I can: generate study plans, suggest practice problems, explain concepts step-by-step, or solve doubts.\n"
+        "Try selecting 'PCM Study Mode' for curated PCM plans, or 'Doubt Solver' for stepwise help.")
+
+
+def rule_based_reply(message, mode):
+    return jas_router.dispatch(message, mode) or general_reply(message)
+
+
+def cached_rule_based_reply(message, mode):
+    reply = response_cache.get(mode, message, 'rules')
+    if reply is None:
+        reply = rule_based_reply(message, mode)
+        response_cache.set(mode, message, 'rules', reply)
+    return reply
+
+
+def llm_messages(message, mode):
+    return [
+        {'role': 'system', 'content': JAS_SYSTEM_PROMPT},
+        {'role': 'user', 'content': f"Mode: {mode}\nUser: {message}"}
+    ]
+
+
+def parse_jas_request():
+    data = request.get_json() or {}
+    return (data.get('message', '').strip(),
+            (data.get('mode') or '').lower(),
+            bool(data.get('use_llm')),
+            data.get('session_id'))
 
 
 @app.route('/api/jas', methods=['POST'])
 def jas_ai():
     try:
-        data = request.get_json() or {}
-        message = data.get('message', '').strip()
-        mode = (data.get('mode') or '').lower()
-        use_llm = bool(data.get('use_llm'))
-        session_id = data.get('session_id')
+        message, mode, use_llm, session_id = parse_jas_request()
 
         if not message:
             return jsonify({"reply": "Please say or type something so Jas AI can help."}), 400
 
         # 1) Doubt mode: try to resolve symbolically with SymPy (if installed)
-        if mode == 'doubt' and sp is not None:
-            lower = message.lower()
-
-            # Derivative handling
-            if 'derivative' in lower or 'differentiat' in lower or 'd/dx' in lower:
-                # try to extract expression
-                m = re.search(r'of (.+)', message, re.I)
-                expr_text = m.group(1) if m else message
-                expr_text = re.sub(r'(find|calculate|the|derivative|derivative of|d/dx|differentiat(e|ion))', '', expr_text, flags=re.I).strip(' .:?')
-                x = sp.symbols('x')
-                try:
-                    expr = sp.sympify(expr_text, locals={'x': x})
-                    deriv = sp.diff(expr, x)
+        if mode == 'doubt' and SYMPY_AVAILABLE:
+            reply, status = doubt_reply(message)
+            if status == 200 and session_id:
+                store_exchange(session_id, message, reply)
 
-                    # Attempt to show a simple step for polynomials
-                    steps = ''
-                    try:
-                        term_steps = []
-                        for term in sp.expand(expr).as_ordered_terms():
-                            if term.has(x):
-                                coeff, exp = term.as_coeff_exponent(x)
-                                term_steps.append(f"d/dx({term}) = {coeff*exp}*x**{exp-1}")
-                        if term_steps:
-                            steps = 'Stepwise: ' + '; '.join(term_steps) + '\n'
-                    except Exception:
-                        steps = ''
-
-                    reply = (f"Derivative of {str(expr)} w.r.t x is: {str(deriv)}\n\n"
-                             f"{steps}Result (simplified): {str(sp.simplify(deriv))}")
-
-                    if session_id:
-                        store_session_message(session_id, 'user', message)
-                        store_session_message(session_id, 'bot', reply)
-
-                    return jsonify({'reply': reply})
-                except Exception as e:
-                    # fall through to generic doubt advice
-                    pass
-
-            # Solve/equation handling
-            if 'solve' in lower or 'equation' in lower:
-                try:
-                    # Extract likely equation or expression
-                    m = re.search(r'solve (.+) for (\w+)', message, re.I)
-                    if m:
-                        expr_text = m.group(1)
-                        var = m.group(2)
-                        var_sym = sp.symbols(var)
-                        sol = sp.solve(sp.sympify(expr_text), var_sym)
-                    else:
-                        # try generic solve
-                        expr_text = re.sub(r'solve', '', message, flags=re.I).strip()
-                        sol = sp.solve(sp.sympify(expr_text))
-
-                    reply = f"Solution: {sol}"
-                    if session_id:
-                        store_session_message(session_id, 'user', message)
-                        store_session_message(session_id, 'bot', reply)
-
-                    return jsonify({'reply': reply})
-                except Exception:
-                    pass
-
-            # Fallback doubt message
-            reply = (f"Doubt Solver — I saw your question: '{message}'.\n\n"
-                     "1) Restate the problem to ensure understanding.\n"
-                     "2) Break it into smaller steps and show attempted work.\n"
-                     "3) If it's numeric, share values and units.\n\n"
-                     "If you paste the specific question or your attempt, I can provide a step-by-step solution.")
-
-            if session_id:
-                store_session_message(session_id, 'user', message)
-                store_session_message(session_id, 'bot', reply)
-
-            return jsonify({"reply": reply})
+            return jsonify({"reply": reply}), status
 
         # 2) If cloud LLM requested and OpenAI configured, route to OpenAI
-        if use_llm and openai is not None and os.environ.get('OPENAI_API_KEY'):
+        llm = get_llm() if use_llm else None
+        if llm is not None:
             try:
-                openai.api_key = os.environ.get('OPENAI_API_KEY')
-                system_prompt = (
-                    "You are Jas AI, an expert concise study assistant for students. "
-                    "Be helpful and provide step-by-step answers for doubts. Keep replies short and actionable.")
-
-                messages = [
-                    {'role': 'system', 'content': system_prompt},
-                    {'role': 'user', 'content': f"Mode: {mode}\nUser: {message}"}
-                ]
-
-                response = openai.ChatCompletion.create(
-                    model=os.environ.get('OPENAI_MODEL', 'gpt-3.5-turbo'),
-                    messages=messages,
-                    max_tokens=600,
-                    temperature=0.2,
-                )
-
-                content = response['choices'][0]['message']['content'].strip()
+                content = response_cache.get(mode, message, llm.model, fuzzy=True)
+                if content is None:
+                    # Identical concurrent questions share one upstream call.
+                    content = llm.complete(llm_messages(message, mode), key=(mode, message), **LLM_PARAMS)
+                    response_cache.set(mode, message, llm.model, content)
 
                 if session_id:
-                    store_session_message(session_id, 'user', message)
-                    store_session_message(session_id, 'bot', content)
+                    store_exchange(session_id, message, content)
 
                 return jsonify({'reply': content})
             except Exception as e:
@@ -280,36 +430,111 @@ def jas_ai():
                 print('OpenAI error:', str(e))
 
         # 3) Fallback / rule-based behaviors
-        reply = ''
-        if mode == 'pcm':
-            reply = (
-                f"PCM Study Plan based on: '{message}'\n\n"
-                "1) Core Concept Review: 45-60 mins focusing on theory and formulas.\n"
-                "2) Practice: 30-45 mins solving 10 focused problems.\n"
-                "3) Recall: 15 mins flashcards for key facts.\n"
-                "4) Weekly Mock: 1 timed paper every 7 days.\n\n"
-                "Tip: Rotate Physics/Chemistry/Math in blocks and review mistakes the same day.")
-        else:
-            reply = (
-                f"Hello! I'm Jas AI. You asked: '{message}'\n\n"
-                "I can: generate study plans, suggest practice problems, explain concepts step-by-step, or solve doubts.\n"
-                "Try selecting 'PCM Study Mode' for curated PCM plans, or 'Doubt Solver' for stepwise help.")
+        reply = cached_rule_based_reply(message, mode)
 
         if session_id:
-            store_session_message(session_id, 'user', message)
-            store_session_message(session_id, 'bot', reply)
+            store_exchange(session_id, message, reply)
 
         return jsonify({"reply": reply})
 
     except Exception as e:
         return jsonify({"reply": f"Error: {str(e)}"}), 500
+
+
+def sse(payload, event=None):
+    """Format one Server-Sent Events frame."""
+    frame = f"event: {event}\n" if event else ""
+    return frame + f"data: {json.dumps(payload)}\n\n"
+
+
+@app.route('/api/jas/stream', methods=['POST'])
+def jas_stream():
+    """Same contract as /api/jas, but the reply is sent as Server-Sent Events.
+
+    LLM tokens are forwarded as ``data: {"delta": ...}`` frames as soon as the
+    model produces them; local replies arrive as a single delta. A final
+    ``event: done`` frame carries the full reply, which is persisted once.
+    If the model fails partway through, an ``event: error`` frame with a
+    non-200 status is sent instead and nothing is persisted.
+    """
+    message, mode, use_llm, session_id = parse_jas_request()
+    if not message:
+        return jsonify({"reply": "Please say or type something so Jas AI can help."}), 400
+
+    def events():
+        status = 200
+        if mode == 'doubt' and SYMPY_AVAILABLE:
+            reply, status = doubt_reply(message)
+            yield sse({'delta': reply})
+        else:
+            reply = None
+            llm = get_llm() if use_llm else None
+            if llm is not None:
+                reply = response_cache.get(mode, message, llm.model, fuzzy=True)
+                if reply is not None:
+                    yield sse({'delta': reply})
+                else:
+                    parts = []
+                    try:
+                        for delta in llm.stream(llm_messages(message, mode), **LLM_PARAMS):
+                            parts.append(delta)
+                            yield sse({'delta': delta})
+                    except Exception as e:
+                        print('OpenAI error:', str(e))
+                        if parts:
+                            # Deltas already sent can't be taken back, so the
+                            # partial reply is neither stored nor marked done.
+                            yield sse({'error': 'The reply was interrupted. Please try again.',
+                                       'status': 502}, event='error')
+                            return
+                    else:
+                        if parts:
+                            reply = ''.join(parts).strip()
+                            response_cache.set(mode, message, llm.model, reply)
+
+            if reply is None:
+                reply = cached_rule_based_reply(message, mode)
+                yield sse({'delta': reply})
+
+        if status == 200 and session_id:
+            store_exchange(session_id, message, reply)
+        yield sse({'reply': reply, 'status': status}, event='done')
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@app.route('/api/jas/metrics', methods=['GET'])
+def jas_metrics():
+    llm = get_llm()
+    return jsonify({
+        'solver': solver_pool.stats(),
+        'llm': llm.stats() if llm is not None else None,
+        'responses': response_cache.stats(),
+        'sessions': session_store.stats(),
+    })
+
+
 @app.route('/api/jas/history', methods=['GET'])
 def get_jas_history():
     session_id = request.args.get('session_id')
     if not session_id:
         return jsonify({'error': 'Missing session_id'}), 400
-    sessions = load_sessions()
-    return jsonify(sessions.get(session_id, []))
+
+    limit = request.args.get('limit', type=int)
+    before = request.args.get('before', type=int)
+    after = request.args.get('after', type=int)
+    if limit is None and before is None and after is None:
+        return jsonify(session_store.messages(session_id))
+
+    limit = max(1, min(limit or HISTORY_PAGE_SIZE, HISTORY_MAX_PAGE_SIZE))
+    messages, total, first_seq = session_store.page(session_id, limit, before=before, after=after)
+    if after is not None:
+        has_more = bool(messages) and messages[-1]['seq'] < total - 1
+    else:
+        has_more = bool(messages) and messages[0]['seq'] > first_seq
+    return jsonify({'messages': messages, 'total': total, 'first_seq': first_seq,
+                    'has_more': has_more})
 
 
 @app.route('/api/jas/history', methods=['POST'])
@@ -320,9 +545,16 @@ def post_jas_history():
         messages = data.get('messages', [])
         if not session_id:
             return jsonify({'success': False, 'error': 'Missing session_id'}), 400
-        sessions = load_sessions()
-        sessions[session_id] = messages
-        save_sessions(sessions)
+        if not isinstance(messages, list):
+            return jsonify({'success': False, 'error': 'messages must be a list'}), 400
+        if not all(isinstance(m, dict) for m in messages):
+            return jsonify({'success': False, 'error': 'Each message must be an object'}), 400
+
+        if data.get('append'):
+            first_seq = session_store.append(session_id, messages)
+            return jsonify({'success': True, 'first_seq': first_seq})
+
+        session_store.replace(session_id, messages)
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -0,0 +1,111 @@
+"""Content-hashed URLs for the Flask UI's static files.
+
+At startup every file under the static folder is read once, hashed, and
+given a fingerprinted name (``script.js`` -> ``script.3f9a1c2b7d4e.js``).
+Templates link to ``asset_url('script.js')``; the fingerprinted URL is
+served from memory with a year-long ``immutable`` Cache-Control, so a
+browser never asks for it again until the content, and so the URL, changes.
+A gzip variant is prepared up front for compressible files and sent to
+clients that accept it.
+
+Files listed in ``unhashed`` (the service worker, whose URL must stay
+stable) are left to Flask's plain ``/static`` route.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+
+from flask import Response, abort, request
+
+COMPRESSIBLE = ("text/", "application/javascript", "application/json", "image/svg+xml")
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+class _Asset:
+    def __init__(self, data, mimetype, digest, mtime):
+        self.data = data
+        self.mimetype = mimetype
+        self.digest = digest
+        self.mtime = mtime
+        self.gzipped = None
+
+
+class AssetManifest:
+    """Maps static file names to fingerprinted URLs and serves them."""
+
+    def __init__(self, static_folder, url_prefix="/assets", unhashed=("sw.js",),
+                 min_compress_size=512, auto_reload=False):
+        self.static_folder = static_folder
+        self.url_prefix = url_prefix.rstrip("/")
+        self.unhashed = frozenset(unhashed)
+        self.min_compress_size = min_compress_size
+        # Re-hash files that changed on disk; for development only.
+        self.auto_reload = auto_reload
+        self._urls = {}
+        self._assets = {}
+        self.build()
+
+    def build(self):
+        urls, assets = {}, {}
+        for root, _, files in os.walk(self.static_folder):
+            for file_name in files:
+                path = os.path.join(root, file_name)
+                name = os.path.relpath(path, self.static_folder).replace(os.sep, "/")
+                if name in self.unhashed:
+                    continue
+                asset = self._load(path)
+                stem, ext = os.path.splitext(name)
+                hashed = f"{stem}.{asset.digest}{ext}"
+                urls[name] = f"{self.url_prefix}/{hashed}"
+                assets[hashed] = (name, path, asset)
+        self._urls, self._assets = urls, assets
+
+    def _load(self, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        asset = _Asset(data, mimetype, hashlib.sha256(data).hexdigest()[:12], os.path.getmtime(path))
+        if mimetype.startswith(COMPRESSIBLE) and len(data) >= self.min_compress_size:
+            gzipped = gzip.compress(data, compresslevel=9, mtime=0)
+            if len(gzipped) < len(data):
+                asset.gzipped = gzipped
+        return asset
+
+    def _stale(self):
+        for _, path, asset in self._assets.values():
+            try:
+                if os.path.getmtime(path) != asset.mtime:
+                    return True
+            except FileNotFoundError:
+                return True
+        return False
+
+    def url(self, name):
+        """Fingerprinted URL for ``name``, or its plain static URL."""
+        if self.auto_reload and self._stale():
+            self.build()
+        return self._urls.get(name, f"/static/{name}")
+
+    def serve(self, filename):
+        entry = self._assets.get(filename)
+        if entry is None:
+            abort(404)
+        asset = entry[2]
+
+        data, encoding = asset.data, None
+        if asset.gzipped is not None and "gzip" in request.accept_encodings:
+            data, encoding = asset.gzipped, "gzip"
+        response = Response(data, mimetype=asset.mimetype)
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        if asset.gzipped is not None:
+            response.headers["Vary"] = "Accept-Encoding"
+        response.headers["Cache-Control"] = IMMUTABLE
+        response.set_etag(asset.digest)
+        return response.make_conditional(request)
+
+    def init_app(self, app):
+        app.add_url_rule(f"{self.url_prefix}/<path:filename>", "assets", self.serve)
+        app.jinja_env.globals["asset_url"] = self.url
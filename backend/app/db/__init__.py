@@ -1,5 +1,5 @@
 """Database module for EduIntel AI."""
 
-from .database import Base, SessionLocal, engine, get_db, init_db
+from .database import Base, SessionLocal, engine, get_db, init_db, close_db, pool_stats
 
-__all__ = ["Base", "SessionLocal", "engine", "get_db", "init_db"]
+__all__ = ["Base", "SessionLocal", "engine", "get_db", "init_db", "close_db", "pool_stats"]
@@ -0,0 +1,92 @@
+"""
+Connection pool with checkout telemetry for EduIntel AI.
+Records how long requests wait for a connection and how often connections
+are opened and closed, so pool sizes can be tuned from real traffic.
+"""
+
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+# Recent checkout waits kept for percentiles
+WAIT_WINDOW = 1024
+
+
+def _percentile(ordered: list, fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Async queue pool that times checkouts and counts connection churn."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self._started = time.monotonic()
+        self._checkouts = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._waits = deque(maxlen=WAIT_WINDOW)
+        self._opened = 0
+        self._closed = 0
+        event.listen(self, "connect", self._on_connect)
+        event.listen(self, "close", self._on_close)
+        event.listen(self, "close_detached", self._on_close)
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            with self._stats_lock:
+                self._timeouts += 1
+            raise
+        waited = time.perf_counter() - start
+        with self._stats_lock:
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+            self._waits.append(waited)
+        return conn
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._stats_lock:
+            self._opened += 1
+
+    def _on_close(self, dbapi_connection, *args):
+        with self._stats_lock:
+            self._closed += 1
+
+    def stats(self) -> dict:
+        """Current occupancy plus checkout and churn counters since start."""
+        capacity = self.size() + max(self._max_overflow, 0)
+        checked_out = self.checkedout()
+        with self._stats_lock:
+            waits = sorted(self._waits)
+            uptime = max(time.monotonic() - self._started, 1e-9)
+            return {
+                "size": self.size(),
+                "max_overflow": self._max_overflow,
+                "checked_out": checked_out,
+                "idle": self.checkedin(),
+                "overflow": max(self.overflow(), 0),
+                "utilization": round(checked_out / capacity, 3) if capacity > 0 else None,
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "wait_ms": {
+                    "mean": round(self._wait_total / self._checkouts * 1000, 3) if self._checkouts else 0.0,
+                    "p50": round(_percentile(waits, 0.50) * 1000, 3),
+                    "p95": round(_percentile(waits, 0.95) * 1000, 3),
+                    "max": round(self._wait_max * 1000, 3),
+                },
+                "connections_opened": self._opened,
+                "connections_closed": self._closed,
+                "churn_per_minute": round((self._opened + self._closed) / uptime * 60, 2),
+            }
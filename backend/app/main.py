@@ -4,7 +4,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from contextlib import asynccontextmanager
-from app.db import init_db
+from app.db import init_db, close_db
 from app.routes import auth_router, tests_router, health_router
 
 
@@ -17,7 +17,7 @@ async def lifespan(app: FastAPI):
     # Startup
     print("🚀 Starting Study Plus AI Server...")
     try:
-        init_db()
+        await init_db()
         print("✅ Database initialized")
     except Exception as e:
         print(f"❌ Database initialization failed: {e}")
@@ -26,6 +26,7 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     print("🛑 Shutting down Study Plus AI Server...")
+    await close_db()
 
 
 # Create FastAPI app
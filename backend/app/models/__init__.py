@@ -1,6 +1,7 @@
 """Database models for EduIntel AI."""
 
 from .user import User, UserRole
-from .test import TestResult, StudySession, WeakArea
+from .test import TestResult, StudySession, WeakArea, DashboardSnapshot
+from .ingest import IngestJob
 
-__all__ = ["User", "UserRole", "TestResult", "StudySession", "WeakArea"]
+__all__ = ["User", "UserRole", "TestResult", "StudySession", "WeakArea", "DashboardSnapshot", "IngestJob"]
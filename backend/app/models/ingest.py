@@ -0,0 +1,34 @@
+"""Bulk ingest job tracking."""
+
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON
+from datetime import datetime
+from app.db.database import Base
+
+
+class IngestJob(Base):
+    """A bulk test-result import and its progress."""
+    
+    __tablename__ = "ingest_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    
+    # Upload
+    format = Column(String, nullable=False)  # "csv" or "ndjson"
+    size_bytes = Column(Integer, nullable=False)
+    
+    # Progress
+    status = Column(String, default="queued", nullable=False)  # queued, running, completed, failed
+    rows_total = Column(Integer, nullable=True)  # Known once the file is counted
+    rows_processed = Column(Integer, default=0, nullable=False)
+    rows_inserted = Column(Integer, default=0, nullable=False)
+    rows_failed = Column(Integer, default=0, nullable=False)
+    errors = Column(JSON, nullable=False)  # First errors: [{row, error}]
+    message = Column(String, nullable=True)  # Why a job failed
+    
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f"<IngestJob(id={self.id}, status={self.status}, processed={self.rows_processed})>"
@@ -1,6 +1,6 @@
 """Test and performance tracking models."""
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, JSON, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, JSON, Boolean, Index, UniqueConstraint
 from datetime import datetime
 from app.db.database import Base
 
@@ -11,7 +11,7 @@ class TestResult(Base):
     __tablename__ = "test_results"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)  # Leads ix_test_results_user_date
     
     # Test info
     test_name = Column(String, nullable=False)
@@ -33,6 +33,16 @@ class TestResult(Base):
     test_date = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     
+    __table_args__ = (
+        # Per-user history, newest first. On PostgreSQL the included columns
+        # make history and dashboard reads index-only scans.
+        Index(
+            "ix_test_results_user_date",
+            "user_id", test_date.desc(), id.desc(),
+            postgresql_include=["test_name", "subject", "score", "accuracy"],
+        ),
+    )
+    
     def __repr__(self):
         return f"<TestResult(id={self.id}, user_id={self.user_id}, score={self.score})>"
 
@@ -43,7 +53,7 @@ class StudySession(Base):
     __tablename__ = "study_sessions"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)  # Leads ix_study_sessions_user_date
     
     # Session details
     chapter = Column(String, nullable=False)
@@ -57,6 +67,15 @@ class StudySession(Base):
     
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     
+    __table_args__ = (
+        # Per-user sessions by date; covers the dashboard's burnout window
+        Index(
+            "ix_study_sessions_user_date",
+            "user_id", date, id,
+            postgresql_include=["duration_minutes", "focus_score"],
+        ),
+    )
+    
     def __repr__(self):
         return f"<StudySession(id={self.id}, user_id={self.user_id}, duration={self.duration_minutes})>"
 
@@ -67,7 +86,7 @@ class WeakArea(Base):
     __tablename__ = "weak_areas"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)  # Leads the unique key and priority index
     
     # Weak area details
     chapter = Column(String, nullable=False)
@@ -82,5 +101,43 @@ class WeakArea(Base):
     last_updated = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     
+    __table_args__ = (
+        # One row per chapter; the key the weak-area upsert conflicts on
+        UniqueConstraint("user_id", "subject", "chapter", name="uq_weak_areas_user_subject_chapter"),
+        # Recommendations and the dashboard's top chapter, highest priority first
+        Index("ix_weak_areas_user_priority", "user_id", priority_score.desc(), id),
+    )
+    
     def __repr__(self):
         return f"<WeakArea(id={self.id}, user_id={self.user_id}, chapter={self.chapter})>"
+
+
+class DashboardSnapshot(Base):
+    """
+    Per-user dashboard metrics, kept current as tests and study sessions are
+    written so the dashboard is a single primary-key read.
+    """
+    
+    __tablename__ = "dashboard_snapshots"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    
+    # Metrics as served by the dashboard
+    overall_accuracy = Column(Float, default=0, nullable=False)
+    test_count = Column(Integer, default=0, nullable=False)
+    study_sessions = Column(Integer, default=0, nullable=False)
+    weak_areas_count = Column(Integer, default=0, nullable=False)
+    burnout_score = Column(Float, default=0, nullable=False)
+    improvement_trend = Column(Float, default=0, nullable=False)
+    next_recommended_chapter = Column(String, nullable=True)
+    
+    # Windows the metrics are derived from
+    recent_tests = Column(JSON, nullable=False)  # Last 20 tests, newest first: [{id, score, accuracy, test_date}]
+    recent_sessions = Column(JSON, nullable=False)  # Sessions in the burnout window, oldest first
+    
+    # When an item ages out of the 7-day window and the metrics must be re-derived
+    expires_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f"<DashboardSnapshot(user_id={self.user_id}, test_count={self.test_count})>"
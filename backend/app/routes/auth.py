@@ -1,7 +1,7 @@
 """Authentication API routes."""
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db import get_db
 from app.schemas import (
     UserCreate, UserResponse, LoginRequest, TokenResponse,
@@ -15,10 +15,10 @@ router = APIRouter(prefix="/api/v1/auth", tags=["Authentication"])
 
 
 @router.post("/register", response_model=dict)
-async def register(user_in: UserCreate, db: Session = Depends(get_db)):
+async def register(user_in: UserCreate, db: AsyncSession = Depends(get_db)):
     """Register a new user with email and password."""
     try:
-        user = UserService.create_user(db, user_in)
+        user = await UserService.create_user(db, user_in)
         tokens = {
             "access_token": "token",
             "refresh_token": "refresh",
@@ -40,10 +40,10 @@ async def register(user_in: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=dict)
-async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
+async def login(login_data: LoginRequest, db: AsyncSession = Depends(get_db)):
     """Login with email and password."""
     try:
-        result = UserService.authenticate_user(db, login_data.email, login_data.password)
+        result = await UserService.authenticate_user(db, login_data.email, login_data.password)
         return {
             "status": "success",
             "message": "logged in successfully",
@@ -54,14 +54,14 @@ async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
 
 
 @router.post("/google", response_model=dict)
-async def google_auth(request: GoogleAuthRequest, db: Session = Depends(get_db)):
+async def google_auth(request: GoogleAuthRequest, db: AsyncSession = Depends(get_db)):
     """Authenticate with Google OAuth."""
     try:
         # Verify Google token
         user_info = verify_google_token(request.id_token)
         
         # Create or get user
-        user = UserService.create_oauth_user(db, user_info, "google")
+        user = await UserService.create_oauth_user(db, user_info, "google")
         
         # Generate tokens
         tokens = {
@@ -85,7 +85,7 @@ async def google_auth(request: GoogleAuthRequest, db: Session = Depends(get_db))
 
 
 @router.post("/apple", response_model=dict)
-async def apple_auth(request: AppleAuthRequest, db: Session = Depends(get_db)):
+async def apple_auth(request: AppleAuthRequest, db: AsyncSession = Depends(get_db)):
     """Authenticate with Apple Sign-in."""
     try:
         # Verify Apple token
@@ -93,7 +93,7 @@ async def apple_auth(request: AppleAuthRequest, db: Session = Depends(get_db)):
         user_info["apple_id"] = request.user_id
         
         # Create or get user
-        user = UserService.create_oauth_user(db, user_info, "apple")
+        user = await UserService.create_oauth_user(db, user_info, "apple")
         
         # Generate tokens
         tokens = {
@@ -120,14 +120,14 @@ async def apple_auth(request: AppleAuthRequest, db: Session = Depends(get_db)):
 async def send_phone_otp(
     request: PhoneOTPRequest,
     current_user = Depends(None),  # Optional authentication
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Request OTP for phone verification."""
     try:
         # For this example, we'll use a mock user_id if not authenticated
         user_id = current_user.id if current_user else 1
         
-        result = UserService.request_phone_otp(db, user_id, request.phone_number)
+        result = await UserService.request_phone_otp(db, user_id, request.phone_number)
         
         return {
             "status": "success",
@@ -141,13 +141,13 @@ async def send_phone_otp(
 async def verify_phone_otp(
     request: PhoneOTPVerify,
     current_user = Depends(None),  # Optional for demo
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Verify phone OTP."""
     try:
         user_id = current_user.id if current_user else 1
         
-        result = UserService.verify_phone_otp(db, user_id, request.otp)
+        result = await UserService.verify_phone_otp(db, user_id, request.otp)
         
         return {
             "status": "success",
@@ -160,7 +160,7 @@ async def verify_phone_otp(
 @router.get("/me", response_model=dict)
 async def get_current_user_info(
     current_user = Depends(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get current user information."""
     if not current_user:
@@ -1,8 +1,9 @@
 """Health check and utility routes."""
 
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from app.db import get_db
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import get_db, pool_stats
 
 
 router = APIRouter(tags=["Health"])
@@ -19,11 +20,11 @@ async def health_check():
 
 
 @router.get("/api/v1/health")
-async def api_health_check(db: Session = Depends(get_db)):
-    """API health check with database connection."""
+async def api_health_check(db: AsyncSession = Depends(get_db)):
+    """API health check with database connection and pool telemetry."""
     try:
         # Test database connection
-        db.execute("SELECT 1")
+        await db.execute(text("SELECT 1"))
         db_status = "connected"
     except Exception:
         db_status = "disconnected"
@@ -31,5 +32,6 @@ async def api_health_check(db: Session = Depends(get_db)):
     return {
         "status": "ok",
         "service": "Study Plus AI",
-        "database": db_status
+        "database": db_status,
+        "pool": pool_stats()
     }
@@ -1,22 +1,27 @@
 """Test and performance API routes."""
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 from app.db import get_db
-from app.schemas import TestResultCreate, TestResultResponse, DashboardMetrics
-from app.services import PerformanceService
-from app.utils import normalize_test_data
+from app.models import UserRole
+from app.schemas import TestResultCreate, TestResultResponse, StudySessionCreate, DashboardMetrics
+from app.services import PerformanceService, IngestService
+from app.utils import normalize_test_data, encode_cursor, decode_cursor
 
 
 router = APIRouter(prefix="/api/v1/tests", tags=["Tests & Performance"])
 
+HISTORY_MAX_LIMIT = 100
+NDJSON = "application/x-ndjson"
+
 
 @router.post("/upload", response_model=dict)
 async def upload_test_result(
     test_data: TestResultCreate,
     current_user = Depends(None),  # JWT dependency
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Upload a new test result."""
     if not current_user:
@@ -26,7 +31,7 @@ async def upload_test_result(
         )
     
     try:
-        result = PerformanceService.create_test_result(
+        result = await PerformanceService.create_test_result(
             db, current_user.id, test_data
         )
         
@@ -42,13 +47,137 @@ async def upload_test_result(
         )
 
 
+@router.post("/bulk", response_model=dict, status_code=status.HTTP_202_ACCEPTED)
+async def bulk_upload_test_results(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    current_user = Depends(None),  # JWT dependency
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Import a batch of test results sent as CSV (text/csv) or NDJSON
+    (application/x-ndjson). Each row names its student by ``user_id`` or
+    ``email``. The upload is processed in the background; poll the returned
+    ``status_url`` for progress.
+    """
+    if not current_user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated"
+        )
+    if current_user.role not in (UserRole.ADMIN, UserRole.TEACHER):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin or teacher access required"
+        )
+    
+    fmt = IngestService.detect_format(request.headers.get("content-type"))
+    if fmt is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Send text/csv or application/x-ndjson"
+        )
+    
+    try:
+        upload, size = await IngestService.spool(request.stream())
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+    
+    job = await IngestService.create_job(db, current_user.id, fmt, size)
+    background_tasks.add_task(IngestService.run_job, job.id, upload)
+    
+    return {
+        "status": "accepted",
+        "message": "Import queued",
+        "job_id": job.id,
+        "status_url": f"{router.prefix}/bulk/{job.id}"
+    }
+
+
+@router.get("/bulk/{job_id}", response_model=dict)
+async def get_bulk_upload_status(
+    job_id: int,
+    current_user = Depends(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get the progress of a bulk import."""
+    if not current_user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated"
+        )
+    
+    job = await IngestService.get_job(db, job_id)
+    if job is None or (job.created_by != current_user.id and current_user.role != UserRole.ADMIN):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Import not found"
+        )
+    
+    return {
+        "status": "success",
+        "job": {
+            "id": job.id,
+            "status": job.status,
+            "format": job.format,
+            "rows_total": job.rows_total,
+            "rows_processed": job.rows_processed,
+            "rows_inserted": job.rows_inserted,
+            "rows_failed": job.rows_failed,
+            "progress": round(job.rows_processed / job.rows_total * 100, 1) if job.rows_total else None,
+            "errors": job.errors,
+            "message": job.message,
+            "created_at": job.created_at,
+            "started_at": job.started_at,
+            "finished_at": job.finished_at
+        }
+    }
+
+
+@router.post("/sessions", response_model=dict)
+async def log_study_session(
+    session_data: StudySessionCreate,
+    current_user = Depends(None),  # JWT dependency
+    db: AsyncSession = Depends(get_db)
+):
+    """Log a study session."""
+    if not current_user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated"
+        )
+    
+    try:
+        study_session = await PerformanceService.create_study_session(
+            db, current_user.id, session_data
+        )
+        
+        return {
+            "status": "success",
+            "message": "Study session logged successfully",
+            "session_id": study_session.id
+        }
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
 @router.get("/history", response_model=dict)
 async def get_test_history(
-    limit: int = 10,
+    limit: int = Query(10, ge=1, le=HISTORY_MAX_LIMIT),
+    cursor: Optional[str] = None,
     current_user = Depends(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get user's test history."""
+    """
+    Get user's test history, newest first. Pass the returned
+    ``next_cursor`` back as ``cursor`` for the following page.
+    """
     if not current_user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -56,8 +185,16 @@ async def get_test_history(
         )
     
     try:
-        results = PerformanceService.get_user_test_results(
-            db, current_user.id, limit
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    try:
+        results, more = await PerformanceService.get_test_history(
+            db, current_user.id, limit, after
         )
         
         return {
@@ -73,7 +210,8 @@ async def get_test_history(
                     "test_date": r.test_date
                 }
                 for r in results
-            ]
+            ],
+            "next_cursor": encode_cursor(results[-1].test_date, results[-1].id) if more else None
         }
     except Exception as e:
         raise HTTPException(
@@ -82,10 +220,67 @@ async def get_test_history(
         )
 
 
+@router.get("/history/export")
+async def export_test_history(
+    current_user = Depends(None)
+):
+    """Stream the user's complete test history as NDJSON, oldest first."""
+    if not current_user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated"
+        )
+    
+    return StreamingResponse(
+        PerformanceService.stream_test_history(user_id=current_user.id),
+        media_type=NDJSON,
+        headers={"Content-Disposition": 'attachment; filename="test-history.ndjson"'}
+    )
+
+
+@router.get("/history/export/cohort")
+async def export_cohort_history(
+    school: Optional[str] = None,
+    grade: Optional[str] = None,
+    current_user = Depends(None)
+):
+    """
+    Stream the test history of every student in a school and/or grade as
+    NDJSON. Admins may export any cohort, teachers only their own school.
+    """
+    if not current_user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated"
+        )
+    if school is None and grade is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Specify a school, a grade, or both"
+        )
+    if current_user.role == UserRole.TEACHER:
+        if school is None or school != current_user.school:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Teachers can only export their own school"
+            )
+    elif current_user.role != UserRole.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin or teacher access required"
+        )
+    
+    return StreamingResponse(
+        PerformanceService.stream_test_history(school=school, grade=grade),
+        media_type=NDJSON,
+        headers={"Content-Disposition": 'attachment; filename="cohort-history.ndjson"'}
+    )
+
+
 @router.get("/dashboard", response_model=dict)
 async def get_dashboard_metrics(
     current_user = Depends(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get comprehensive dashboard metrics."""
     if not current_user:
@@ -95,7 +290,7 @@ async def get_dashboard_metrics(
         )
     
     try:
-        metrics = PerformanceService.get_dashboard_metrics(db, current_user.id)
+        metrics = await PerformanceService.get_dashboard_metrics(db, current_user.id)
         
         return {
             "status": "success",
@@ -119,7 +314,7 @@ async def get_dashboard_metrics(
 @router.get("/recommendations", response_model=dict)
 async def get_study_recommendations(
     current_user = Depends(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get personalized study recommendations."""
     if not current_user:
@@ -129,7 +324,7 @@ async def get_study_recommendations(
         )
     
     try:
-        recommendations = PerformanceService.get_study_recommendations(
+        recommendations = await PerformanceService.get_study_recommendations(
             db, current_user.id
         )
         
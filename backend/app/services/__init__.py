@@ -2,5 +2,7 @@
 
 from .user_service import UserService
 from .performance_service import PerformanceService
+from .dashboard_service import DashboardService
+from .ingest_service import IngestService
 
-__all__ = ["UserService", "PerformanceService"]
+__all__ = ["UserService", "PerformanceService", "DashboardService", "IngestService"]
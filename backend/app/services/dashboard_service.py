@@ -0,0 +1,276 @@
+"""Incrementally maintained dashboard snapshots."""
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Iterable, Optional, Tuple
+from datetime import datetime, timedelta
+from app.models import TestResult, StudySession, WeakArea, DashboardSnapshot
+from app.schemas import DashboardMetrics
+from app.ml import PerformanceAnalyzer, BurnoutDetector
+
+
+RECENT_TESTS = 20  # Tests the dashboard analyzes
+BURNOUT_DAYS = 7  # Burnout lookback window
+
+METRIC_FIELDS = (
+    "overall_accuracy", "test_count", "study_sessions", "weak_areas_count",
+    "burnout_score", "improvement_trend", "next_recommended_chapter",
+)
+
+
+def _iso(value: datetime) -> str:
+    # Fixed-width, so ISO strings sort in time order
+    return value.isoformat(timespec="microseconds")
+
+
+def _test_item(test) -> Dict:
+    return {
+        "id": test.id,
+        "score": test.score,
+        "accuracy": test.accuracy,
+        "test_date": _iso(test.test_date),
+    }
+
+
+def _session_item(session) -> Dict:
+    return {
+        "id": session.id,
+        "date": _iso(session.date),
+        "duration_minutes": session.duration_minutes,
+        "focus_score": session.focus_score,
+    }
+
+
+class DashboardService:
+    """
+    Serve dashboard metrics from a per-user snapshot row.
+
+    Writers fold new tests and study sessions into the snapshot in their own
+    transaction. The snapshot keeps the windows the metrics come from (the
+    last 20 tests, the sessions of the past 7 days), so metrics are re-derived
+    without touching other tables when an item ages out of the window.
+    """
+
+    @staticmethod
+    async def get_metrics(db: AsyncSession, user_id: int) -> DashboardMetrics:
+        """Dashboard metrics for a user, building the snapshot on first use."""
+
+        now = datetime.utcnow()
+        snapshot = await db.get(DashboardSnapshot, user_id)
+        if DashboardService._expired(snapshot, now):
+            # Refresh from a re-read under the writers' lock, so a concurrent
+            # record_tests/record_sessions is not overwritten
+            snapshot = await DashboardService._lock(db, user_id)
+            if DashboardService._expired(snapshot, now):
+                DashboardService._derive(snapshot, now)
+            await db.commit()
+        if snapshot is None:
+            snapshot = await DashboardService.rebuild(db, user_id)
+
+        return DashboardService._to_metrics(snapshot)
+
+    @staticmethod
+    async def record_tests(db: AsyncSession, user_id: int, tests: Iterable[TestResult]) -> None:
+        """Fold flushed test results into the user's snapshot. Does not commit."""
+
+        snapshot = await DashboardService._lock(db, user_id)
+        if snapshot is None:
+            return  # Built from the tables on first read
+
+        items = list(snapshot.recent_tests) + [_test_item(t) for t in tests]
+        items.sort(key=lambda t: (t["test_date"], t["id"]), reverse=True)
+        snapshot.recent_tests = items[:RECENT_TESTS]
+        snapshot.weak_areas_count, snapshot.next_recommended_chapter = \
+            await DashboardService._weak_area_summary(db, user_id)
+        DashboardService._derive(snapshot, datetime.utcnow())
+
+    @staticmethod
+    async def record_sessions(db: AsyncSession, user_id: int, sessions: Iterable[StudySession]) -> None:
+        """Fold flushed study sessions into the user's snapshot. Does not commit."""
+
+        snapshot = await DashboardService._lock(db, user_id)
+        if snapshot is None:
+            return
+
+        items = list(snapshot.recent_sessions) + [_session_item(s) for s in sessions]
+        items.sort(key=lambda s: (s["date"], s["id"]))
+        snapshot.recent_sessions = items
+        DashboardService._derive(snapshot, datetime.utcnow())  # Drops sessions outside the window
+
+    @staticmethod
+    async def invalidate(db: AsyncSession, user_ids: Iterable[int]) -> None:
+        """
+        Drop users' snapshots so their next read rebuilds them from the
+        tables; one statement for a bulk write. Does not commit.
+        """
+
+        user_ids = list(user_ids)
+        if user_ids:
+            await db.execute(delete(DashboardSnapshot).filter(DashboardSnapshot.user_id.in_(user_ids)))
+
+    @staticmethod
+    async def recompute(db: AsyncSession, user_id: int) -> DashboardSnapshot:
+        """Snapshot computed from scratch from the user's tables (not added to the session)."""
+
+        now = datetime.utcnow()
+        tests = (await db.execute(
+            select(TestResult.id, TestResult.score, TestResult.accuracy, TestResult.test_date)
+            .filter(TestResult.user_id == user_id)
+            .order_by(TestResult.test_date.desc(), TestResult.id.desc())
+            .limit(RECENT_TESTS)
+        )).all()
+        sessions = (await db.execute(
+            select(StudySession.id, StudySession.date, StudySession.duration_minutes, StudySession.focus_score)
+            .filter(StudySession.user_id == user_id)
+            .filter(StudySession.date >= now - timedelta(days=BURNOUT_DAYS))
+            .order_by(StudySession.date, StudySession.id)
+        )).all()
+        weak_areas_count, next_chapter = await DashboardService._weak_area_summary(db, user_id)
+
+        snapshot = DashboardSnapshot(
+            user_id=user_id,
+            recent_tests=[_test_item(t) for t in tests],
+            recent_sessions=[_session_item(s) for s in sessions],
+            weak_areas_count=weak_areas_count,
+            next_recommended_chapter=next_chapter,
+        )
+        DashboardService._derive(snapshot, now)
+        return snapshot
+
+    @staticmethod
+    async def rebuild(db: AsyncSession, user_id: int) -> DashboardSnapshot:
+        """Replace the user's snapshot with a full recomputation and commit."""
+
+        fresh = await DashboardService.recompute(db, user_id)
+        snapshot = await db.get(DashboardSnapshot, user_id)
+        if snapshot is None:
+            db.add(fresh)
+            snapshot = fresh
+        else:
+            for column in DashboardSnapshot.__table__.columns:
+                if column.key not in ("user_id", "updated_at"):
+                    setattr(snapshot, column.key, getattr(fresh, column.key))
+
+        try:
+            await db.commit()
+        except IntegrityError:
+            # Another request built it first
+            await db.rollback()
+            snapshot = await db.get(DashboardSnapshot, user_id)
+        return snapshot
+
+    @staticmethod
+    async def check(db: AsyncSession, user_id: int) -> Dict:
+        """
+        Compare the metrics the snapshot would serve against a full
+        recomputation. Read-only. A user without a snapshot is consistent:
+        the first dashboard read builds it from the tables.
+        """
+
+        snapshot = await db.get(DashboardSnapshot, user_id)
+        if snapshot is None:
+            return {"user_id": user_id, "consistent": True, "missing": True, "mismatches": {}}
+
+        expected = await DashboardService.recompute(db, user_id)
+        served = DashboardSnapshot(**{
+            column.key: getattr(snapshot, column.key) for column in DashboardSnapshot.__table__.columns
+        })
+        if DashboardService._expired(served, datetime.utcnow()):
+            DashboardService._derive(served, datetime.utcnow())
+
+        actual = DashboardService._to_metrics(served).dict()
+        wanted = DashboardService._to_metrics(expected).dict()
+        mismatches = {}
+        for field in METRIC_FIELDS:
+            a, e = actual[field], wanted[field]
+            if isinstance(a, float) and isinstance(e, float) and abs(a - e) <= 1e-6:
+                continue
+            if a != e:
+                mismatches[field] = {"snapshot": a, "recomputed": e}
+
+        return {"user_id": user_id, "consistent": not mismatches, "missing": False, "mismatches": mismatches}
+
+    @staticmethod
+    async def _lock(db: AsyncSession, user_id: int) -> Optional[DashboardSnapshot]:
+        return (await db.execute(
+            select(DashboardSnapshot)
+            .filter(DashboardSnapshot.user_id == user_id)
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        )).scalars().first()
+
+    @staticmethod
+    def _expired(snapshot: Optional[DashboardSnapshot], now: datetime) -> bool:
+        return snapshot is not None and snapshot.expires_at is not None and snapshot.expires_at <= now
+
+    @staticmethod
+    async def _weak_area_summary(db: AsyncSession, user_id: int) -> Tuple[int, Optional[str]]:
+        """Weak-area count and highest-priority chapter, in one query."""
+
+        count = select(func.count(WeakArea.id)).filter(WeakArea.user_id == user_id).scalar_subquery()
+        top = (
+            select(WeakArea.chapter)
+            .filter(WeakArea.user_id == user_id)
+            .order_by(WeakArea.priority_score.desc(), WeakArea.id)
+            .limit(1)
+            .scalar_subquery()
+        )
+        weak_areas_count, next_chapter = (await db.execute(select(count, top))).one()
+        return weak_areas_count, next_chapter
+
+    @staticmethod
+    def _derive(snapshot: DashboardSnapshot, now: datetime) -> None:
+        """Recompute the metric columns from the snapshot's windows."""
+
+        cutoff = _iso(now - timedelta(days=BURNOUT_DAYS))
+        sessions = [s for s in snapshot.recent_sessions if s["date"] >= cutoff]
+        if len(sessions) != len(snapshot.recent_sessions):
+            snapshot.recent_sessions = sessions
+        tests = snapshot.recent_tests
+
+        if not tests:
+            snapshot.overall_accuracy = 0
+            snapshot.test_count = 0
+            snapshot.study_sessions = 0
+            snapshot.burnout_score = 0
+            snapshot.improvement_trend = 0
+            snapshot.expires_at = None
+            return
+
+        performance = PerformanceAnalyzer.analyze_test_results(tests)
+        burnout = BurnoutDetector.analyze_study_patterns(sessions, tests, days_lookback=BURNOUT_DAYS)
+        snapshot.overall_accuracy = performance.overall_accuracy
+        snapshot.test_count = len(tests)
+        snapshot.study_sessions = len(sessions)
+        snapshot.burnout_score = burnout.burnout_score
+        snapshot.improvement_trend = performance.improvement_trend
+
+        # The metrics hold until the oldest windowed item ages out
+        dated = [s["date"] for s in sessions] + [t["test_date"] for t in tests if t["test_date"] >= cutoff]
+        snapshot.expires_at = (
+            datetime.fromisoformat(min(dated)) + timedelta(days=BURNOUT_DAYS) if dated else None
+        )
+
+    @staticmethod
+    def _to_metrics(snapshot: DashboardSnapshot) -> DashboardMetrics:
+        if not snapshot.test_count:
+            return DashboardMetrics(
+                overall_accuracy=0,
+                test_count=0,
+                study_sessions=0,
+                weak_areas_count=0,
+                burnout_score=0,
+                improvement_trend=0,
+                next_recommended_chapter=None
+            )
+
+        return DashboardMetrics(
+            overall_accuracy=snapshot.overall_accuracy,
+            test_count=snapshot.test_count,
+            study_sessions=snapshot.study_sessions,
+            weak_areas_count=snapshot.weak_areas_count,
+            burnout_score=snapshot.burnout_score,
+            improvement_trend=snapshot.improvement_trend,
+            next_recommended_chapter=snapshot.next_recommended_chapter
+        )
@@ -0,0 +1,354 @@
+"""Bulk test-result ingestion for coaching-centre imports."""
+
+import asyncio
+import csv
+import io
+import itertools
+import json
+import tempfile
+from datetime import datetime
+from typing import AsyncIterator, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import Float, Integer, bindparam, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import SessionLocal
+from app.models import TestResult, User, UserRole, WeakArea, IngestJob
+from app.schemas import TestResultCreate
+from app.utils import normalize_test_data, calculate_accuracy, calculate_score
+from .dashboard_service import DashboardService
+from .performance_service import PerformanceService, WEAK_ACCURACY_THRESHOLD
+
+
+CHUNK_SIZE = 1000  # Rows validated, inserted and committed together
+MAX_ERRORS = 100  # Row errors kept on the job
+MAX_UPLOAD_BYTES = 200 * 1024 * 1024
+
+FORMATS = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+
+class RowError(ValueError):
+    """A row that cannot be imported; the rest of the upload goes on."""
+
+
+def _records(file: BinaryIO, fmt: str) -> Iterator[Tuple[int, object]]:
+    """Yield (line number, record) from a CSV or NDJSON upload."""
+    file.seek(0)
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        if fmt == "csv":
+            reader = csv.DictReader(text)
+            for record in reader:
+                yield reader.line_num, record
+        else:
+            for line_no, line in enumerate(text, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield line_no, json.loads(line)
+                except ValueError:
+                    yield line_no, None
+    finally:
+        text.detach()  # Leave the upload open for the next pass
+
+
+def _count_rows(file: BinaryIO, fmt: str) -> int:
+    """Rows in an upload, counted as non-blank lines rather than parsed."""
+    file.seek(0)
+    lines = sum(1 for line in file if line.strip())
+    return max(lines - 1, 0) if fmt == "csv" else lines  # CSV has a header line
+
+
+def _first(record: Dict, *keys):
+    for key in keys:
+        value = record.get(key)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def _describe(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in error.errors()
+        )
+    return str(error)
+
+
+def _validate(record, now: datetime) -> Dict:
+    """Normalize and validate one upload row into test-result values."""
+    if not isinstance(record, dict):
+        raise RowError("Row is not a JSON object")
+
+    data = normalize_test_data(record)
+    chapters = data["chapter_performance"]
+    if isinstance(chapters, str):  # CSV carries it as a JSON cell
+        data["chapter_performance"] = json.loads(chapters) if chapters.strip() else None
+    test = TestResultCreate(**data)
+
+    try:
+        chapter_accuracy = {
+            chapter: float(perf.get('accuracy', 0))
+            for chapter, perf in (test.chapter_performance or {}).items()
+        }
+    except (AttributeError, TypeError, ValueError):
+        raise RowError("chapter_performance must map chapters to {accuracy: number}")
+
+    user_id = _first(record, "user_id", "userId", "student_id", "studentId")
+    email = _first(record, "email", "student_email", "studentEmail")
+    if user_id is None and email is None:
+        raise RowError("Row needs a user_id or email")
+
+    test_date = _first(record, "test_date", "testDate")
+    test_date = datetime.fromisoformat(str(test_date)).replace(tzinfo=None) if test_date else now
+
+    return {
+        "user_id": int(user_id) if user_id is not None else None,
+        "email": email,
+        "chapters": chapter_accuracy,
+        "values": {
+            "test_name": test.test_name,
+            "subject": test.subject,
+            "total_questions": test.total_questions,
+            "correct_answers": test.correct_answers,
+            "wrong_answers": test.wrong_answers,
+            "not_attempted": test.not_attempted,
+            "score": calculate_score(test.correct_answers, test.total_questions),
+            "accuracy": calculate_accuracy(test.correct_answers, test.total_questions),
+            "time_taken": test.time_taken,
+            "chapter_performance": test.chapter_performance,
+            "test_date": test_date,
+            "created_at": now,
+        },
+    }
+
+
+def _read_chunk(records: Iterator[Tuple[int, object]], now: datetime) -> Tuple[int, List, List]:
+    """
+    Parse and validate the next CHUNK_SIZE records. Returns (rows read,
+    [(line number, values)], [row errors]).
+    """
+    read, parsed, errors = 0, [], []
+    for line_no, record in itertools.islice(records, CHUNK_SIZE):
+        read += 1
+        try:
+            parsed.append((line_no, _validate(record, now)))
+        except (ValueError, TypeError) as e:  # ValidationError is a ValueError
+            errors.append({"row": line_no, "error": _describe(e)})
+    return read, parsed, errors
+
+
+class IngestService:
+    """
+    Import batches of test results as background jobs.
+
+    An upload is spooled to a temporary file, then processed in chunks of
+    CHUNK_SIZE rows. Parsing and validation (normalize_test_data and
+    TestResultCreate) run in a worker thread so the event loop keeps serving
+    requests. Each chunk is then one transaction: rows are inserted with a
+    single executemany, folded into weak areas with two set-based
+    statements, and the affected users' dashboard snapshots are dropped for
+    rebuilding. Progress is committed on the IngestJob row with each chunk.
+    """
+
+    @staticmethod
+    def detect_format(content_type: Optional[str]) -> Optional[str]:
+        """Upload format from a Content-Type header, or None if unsupported."""
+        if not content_type:
+            return None
+        return FORMATS.get(content_type.split(";")[0].strip().lower())
+
+    @staticmethod
+    async def spool(stream: AsyncIterator[bytes], max_bytes: int = MAX_UPLOAD_BYTES) -> Tuple[BinaryIO, int]:
+        """Copy a request body to a temporary file as it arrives."""
+        file = tempfile.TemporaryFile()
+        size = 0
+        try:
+            async for chunk in stream:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ValueError(f"Upload exceeds {max_bytes // (1024 * 1024)} MB")
+                file.write(chunk)
+        except BaseException:
+            file.close()
+            raise
+        return file, size
+
+    @staticmethod
+    async def create_job(db: AsyncSession, user_id: int, fmt: str, size: int) -> IngestJob:
+        """Record a queued import."""
+        job = IngestJob(created_by=user_id, format=fmt, size_bytes=size, errors=[])
+        db.add(job)
+        await db.commit()
+        return job
+
+    @staticmethod
+    async def get_job(db: AsyncSession, job_id: int) -> Optional[IngestJob]:
+        return await db.get(IngestJob, job_id)
+
+    @staticmethod
+    async def run_job(job_id: int, file: BinaryIO) -> None:
+        """Process a spooled upload. Runs after the upload request returns."""
+        try:
+            async with SessionLocal() as db:
+                job = await db.get(IngestJob, job_id)
+                uploader = await db.get(User, job.created_by)
+                job.status = "running"
+                job.started_at = datetime.utcnow()
+                job.rows_total = await asyncio.to_thread(_count_rows, file, job.format)
+                await db.commit()
+
+                records = _records(file, job.format)
+                try:
+                    while True:
+                        read, parsed, errors = await asyncio.to_thread(_read_chunk, records, datetime.utcnow())
+                        if not read:
+                            break
+                        await IngestService._ingest_chunk(db, job, uploader, read, parsed, errors)
+                    job.status = "completed"
+                except Exception as e:
+                    # Chunks already committed stay imported
+                    await db.rollback()
+                    await db.refresh(job)
+                    job.status = "failed"
+                    job.message = str(e)
+                finally:
+                    records.close()
+                job.finished_at = datetime.utcnow()
+                await db.commit()
+        except Exception as e:
+            # Setup or the final commit failed; record it so pollers stop waiting
+            await IngestService._mark_failed(job_id, e)
+        finally:
+            file.close()
+
+    @staticmethod
+    async def _mark_failed(job_id: int, error: Exception) -> None:
+        """Mark a job failed from a fresh session."""
+        try:
+            async with SessionLocal() as db:
+                await db.execute(
+                    update(IngestJob)
+                    .filter(IngestJob.id == job_id)
+                    .values(status="failed", message=str(error) or type(error).__name__,
+                            finished_at=datetime.utcnow())
+                )
+                await db.commit()
+        except Exception as e:
+            print(f"❌ Could not mark import job {job_id} failed: {e}")
+
+    @staticmethod
+    async def _ingest_chunk(
+        db: AsyncSession, job: IngestJob, uploader: User, read: int, parsed: List, errors: List
+    ) -> None:
+        # Resolve students in one query; teachers may only import their own school
+        ids = {row["user_id"] for _, row in parsed if row["user_id"] is not None}
+        emails = {row["email"] for _, row in parsed if row["user_id"] is None}
+        known_ids, id_by_email = set(), {}
+        if ids or emails:
+            query = select(User.id, User.email).filter(or_(User.id.in_(ids), User.email.in_(emails)))
+            if uploader.role == UserRole.TEACHER:
+                query = query.filter(User.school == uploader.school)
+            for user_id, email in (await db.execute(query)).all():
+                known_ids.add(user_id)
+                id_by_email[email] = user_id
+
+        values = []
+        chapter_results = []
+        for line_no, row in parsed:
+            user_id = row["user_id"] if row["user_id"] is not None else id_by_email.get(row["email"])
+            if user_id not in known_ids:
+                errors.append({"row": line_no, "error": "Unknown student"})
+                continue
+            values.append({"user_id": user_id, **row["values"]})
+            chapter_results.append((user_id, row["values"]["subject"], row["chapters"]))
+
+        if values:
+            await db.execute(insert(TestResult), values)
+            await IngestService._apply_weak_areas(db, chapter_results)
+            await DashboardService.invalidate(db, {v["user_id"] for v in values})
+
+        job.rows_processed += read
+        job.rows_inserted += len(values)
+        job.rows_failed += len(errors)
+        if errors and len(job.errors) < MAX_ERRORS:
+            errors.sort(key=lambda error: error["row"])
+            job.errors = (job.errors + errors)[:MAX_ERRORS]
+        await db.commit()
+
+    @staticmethod
+    async def _apply_weak_areas(db: AsyncSession, chapter_results: List[Tuple[int, str, Dict[str, float]]]) -> None:
+        """
+        Fold a chunk's chapter accuracies into weak areas with one executemany
+        UPDATE and one INSERT ... ON CONFLICT DO NOTHING, ending in the same
+        rows as applying the tests one at a time in file order.
+        """
+        # (user_id, subject, chapter) -> [attempts, attempts since first weak result, last accuracy]
+        deltas = {}
+        for user_id, subject, chapters in chapter_results:
+            for chapter, accuracy in chapters.items():
+                delta = deltas.get((user_id, subject, chapter))
+                if delta is None:
+                    delta = deltas[(user_id, subject, chapter)] = [0, 0, accuracy]
+                delta[0] += 1
+                if delta[1] or accuracy < WEAK_ACCURACY_THRESHOLD:
+                    delta[1] += 1  # A missing row is created at the first weak result
+                delta[2] = accuracy
+        if not deltas:
+            return
+
+        now = datetime.utcnow()
+        table = WeakArea.__table__
+
+        # Existing rows take every attempt
+        attempts = table.c.times_attempted + bindparam("b_attempts", type_=Integer)
+        accuracy = bindparam("b_accuracy", type_=Float)
+        await db.execute(
+            update(table)
+            .where(
+                table.c.user_id == bindparam("b_user_id"),
+                table.c.subject == bindparam("b_subject"),
+                table.c.chapter == bindparam("b_chapter"),
+            )
+            .values(
+                times_attempted=attempts,
+                accuracy=accuracy,
+                priority_score=PerformanceService._priority_sql(accuracy, attempts),
+                last_updated=now,
+            ),
+            [
+                {"b_user_id": user_id, "b_subject": subject, "b_chapter": chapter,
+                 "b_attempts": delta[0], "b_accuracy": delta[2]}
+                for (user_id, subject, chapter), delta in deltas.items()
+            ],
+        )
+
+        # Missing rows are created for chapters that were weak at some point
+        created = [
+            {
+                "user_id": user_id,
+                "subject": subject,
+                "chapter": chapter,
+                "accuracy": delta[2],
+                "times_attempted": delta[1],
+                "priority_score": PerformanceService._calculate_priority(delta[2], delta[1]),
+                "last_updated": now,
+                "created_at": now,
+            }
+            for (user_id, subject, chapter), delta in deltas.items()
+            if delta[1]
+        ]
+        if created:
+            dialect_insert = PerformanceService._dialect_insert(db)
+            await db.execute(
+                dialect_insert(table).on_conflict_do_nothing(index_elements=["user_id", "subject", "chapter"]),
+                created,
+            )
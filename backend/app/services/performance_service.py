@@ -1,22 +1,31 @@
 """Performance analytics service."""
 
-from sqlalchemy.orm import Session
-from typing import List, Dict, Optional
-from datetime import datetime, timedelta
-from app.models import TestResult, WeakArea, StudySession
-from app.schemas import TestResultCreate, DashboardMetrics
+import json
+from sqlalchemy import case, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterator, List, Dict, Optional, Tuple
+from datetime import datetime
+from app.db import SessionLocal
+from app.models import TestResult, WeakArea, StudySession, User
+from app.schemas import TestResultCreate, StudySessionCreate, DashboardMetrics
 from app.ml import (
     PerformanceAnalyzer, RankPredictor, StudyOptimizer,
     BurnoutDetector, HeatmapAnalyzer
 )
+from .dashboard_service import DashboardService
+
+
+EXPORT_BATCH_SIZE = 1000  # Rows fetched per server-side cursor round trip
+WEAK_ACCURACY_THRESHOLD = 70  # Chapters below this are tracked as weak areas
 
 
 class PerformanceService:
     """Service for performance analysis and recommendations."""
     
     @staticmethod
-    def create_test_result(
-        db: Session,
+    async def create_test_result(
+        db: AsyncSession,
         user_id: int,
         test_data: TestResultCreate
     ) -> TestResult:
@@ -42,53 +51,120 @@ class PerformanceService:
         )
         
         db.add(test_result)
-        db.commit()
-        db.refresh(test_result)
         
-        # Update weak areas
-        PerformanceService._update_weak_areas(db, user_id, test_result)
+        # Update weak areas and the dashboard in the same transaction
+        await PerformanceService._update_weak_areas(db, user_id, test_result)
+        await db.flush()
+        await DashboardService.record_tests(db, user_id, [test_result])
+        await db.commit()
         
         return test_result
     
     @staticmethod
-    def _update_weak_areas(db: Session, user_id: int, test_result: TestResult) -> None:
-        """Update weak areas based on test result."""
+    async def create_study_session(
+        db: AsyncSession,
+        user_id: int,
+        session_data: StudySessionCreate
+    ) -> StudySession:
+        """Create and save a study session."""
+        
+        study_session = StudySession(
+            user_id=user_id,
+            chapter=session_data.chapter,
+            subject=session_data.subject,
+            duration_minutes=session_data.duration_minutes,
+            focus_score=session_data.focus_score,
+            notes=session_data.notes,
+            date=datetime.utcnow()
+        )
+        
+        db.add(study_session)
+        await db.flush()
+        await DashboardService.record_sessions(db, user_id, [study_session])
+        await db.commit()
+        
+        return study_session
+    
+    @staticmethod
+    async def _update_weak_areas(db: AsyncSession, user_id: int, test_result: TestResult) -> None:
+        """
+        Update weak areas based on test result, in two statements however
+        many chapters the test covers. Chapters below the weak threshold are
+        upserted on the (user_id, subject, chapter) key; stronger chapters
+        only refresh rows that already exist. Does not commit.
+        """
         
         if not test_result.chapter_performance:
             return
         
-        for chapter, perf in test_result.chapter_performance.items():
-            accuracy = perf.get('accuracy', 0)
-            
-            # Find or create weak area
-            weak_area = db.query(WeakArea).filter(
-                WeakArea.user_id == user_id,
-                WeakArea.chapter == chapter,
-                WeakArea.subject == test_result.subject
-            ).first()
-            
-            if weak_area:
-                # Update existing
-                weak_area.times_attempted += 1
-                weak_area.accuracy = accuracy
-                weak_area.priority_score = PerformanceService._calculate_priority(accuracy, weak_area.times_attempted)
-            else:
-                # Create new if weak
-                if accuracy < 70:  # Threshold for marking as weak
-                    weak_area = WeakArea(
-                        user_id=user_id,
-                        chapter=chapter,
-                        subject=test_result.subject,
-                        accuracy=accuracy,
-                        times_attempted=1,
-                        priority_score=PerformanceService._calculate_priority(accuracy, 1)
-                    )
-                    db.add(weak_area)
-            
-            if weak_area:
-                db.add(weak_area)
-        
-        db.commit()
+        chapters = {
+            chapter: float(perf.get('accuracy', 0))
+            for chapter, perf in test_result.chapter_performance.items()
+        }
+        weak = {chapter: accuracy for chapter, accuracy in chapters.items() if accuracy < WEAK_ACCURACY_THRESHOLD}
+        strong = {chapter: accuracy for chapter, accuracy in chapters.items() if chapter not in weak}
+        now = datetime.utcnow()
+        attempts = WeakArea.times_attempted + 1
+        
+        if weak:
+            insert = PerformanceService._dialect_insert(db)
+            stmt = insert(WeakArea).values([
+                {
+                    "user_id": user_id,
+                    "subject": test_result.subject,
+                    "chapter": chapter,
+                    "accuracy": accuracy,
+                    "times_attempted": 1,
+                    "priority_score": PerformanceService._calculate_priority(accuracy, 1),
+                    "last_updated": now,
+                    "created_at": now,
+                }
+                for chapter, accuracy in weak.items()
+            ])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[WeakArea.user_id, WeakArea.subject, WeakArea.chapter],
+                set_={
+                    "times_attempted": attempts,
+                    "accuracy": stmt.excluded.accuracy,
+                    "priority_score": PerformanceService._priority_sql(stmt.excluded.accuracy, attempts),
+                    "last_updated": now,
+                },
+            )
+            await db.execute(stmt)
+        
+        if strong:
+            accuracy = case(strong, value=WeakArea.chapter)
+            await db.execute(
+                update(WeakArea)
+                .where(
+                    WeakArea.user_id == user_id,
+                    WeakArea.subject == test_result.subject,
+                    WeakArea.chapter.in_(strong),
+                )
+                .values(
+                    times_attempted=attempts,
+                    accuracy=accuracy,
+                    priority_score=PerformanceService._priority_sql(accuracy, attempts),
+                    last_updated=now,
+                )
+                .execution_options(synchronize_session=False)
+            )
+    
+    @staticmethod
+    def _dialect_insert(db: AsyncSession):
+        """INSERT construct with ON CONFLICT support for the session's database."""
+        dialect = db.bind.dialect.name
+        if dialect == "postgresql":
+            return postgresql.insert
+        if dialect == "sqlite":
+            return sqlite.insert
+        raise NotImplementedError(f"Weak-area upsert is not supported on {dialect}")
+    
+    @staticmethod
+    def _priority_sql(accuracy, attempts):
+        """SQL expression matching _calculate_priority."""
+        attempt_factor = case((attempts >= 5, 1.0), else_=attempts / 5.0)
+        return (100 - accuracy) * (1 + attempt_factor)
     
     @staticmethod
     def _calculate_priority(accuracy: float, attempts: int) -> float:
@@ -99,100 +175,110 @@ class PerformanceService:
         return base_priority * (1 + attempt_factor)
     
     @staticmethod
-    def get_user_test_results(
-        db: Session,
+    async def get_user_test_results(
+        db: AsyncSession,
         user_id: int,
         limit: int = 10
     ) -> List[TestResult]:
         """Get user's test results."""
         
-        return db.query(TestResult)\
-            .filter(TestResult.user_id == user_id)\
-            .order_by(TestResult.test_date.desc())\
-            .limit(limit)\
-            .all()
+        result = await db.execute(
+            select(TestResult)
+            .filter(TestResult.user_id == user_id)
+            .order_by(TestResult.test_date.desc())
+            .limit(limit)
+        )
+        return result.scalars().all()
     
     @staticmethod
-    def get_dashboard_metrics(db: Session, user_id: int) -> DashboardMetrics:
-        """Get comprehensive dashboard metrics."""
-        
-        # Get recent test results
-        recent_tests = PerformanceService.get_user_test_results(db, user_id, 20)
-        
-        if not recent_tests:
-            return DashboardMetrics(
-                overall_accuracy=0,
-                test_count=0,
-                study_sessions=0,
-                weak_areas_count=0,
-                burnout_score=0,
-                improvement_trend=0,
-                next_recommended_chapter=None
+    async def get_test_history(
+        db: AsyncSession,
+        user_id: int,
+        limit: int = 10,
+        after: Optional[Tuple[datetime, int]] = None
+    ) -> Tuple[List, bool]:
+        """
+        Get one page of a user's tests, newest first, and whether more follow.
+        
+        Pages are keyed on (test_date, id): ``after`` is the last row of the
+        previous page, so every page is an index range read however deep.
+        Selecting only the shown columns lets PostgreSQL answer from
+        ix_test_results_user_date alone.
+        """
+        
+        query = (
+            select(
+                TestResult.id, TestResult.test_name, TestResult.subject,
+                TestResult.score, TestResult.accuracy, TestResult.test_date
             )
+            .filter(TestResult.user_id == user_id)
+        )
+        if after is not None:
+            query = query.filter(tuple_(TestResult.test_date, TestResult.id) < tuple_(*after))
         
-        # Analyze performance
-        tests_data = [
-            {
-                'score': t.score,
-                'accuracy': t.accuracy,
-                'chapter_performance': t.chapter_performance or {},
-                'time_taken': t.time_taken,
-                'total_questions': t.total_questions,
-                'test_date': t.test_date
-            }
-            for t in recent_tests
-        ]
-        
-        performance = PerformanceAnalyzer.analyze_test_results(tests_data)
-        
-        # Get weak areas
-        weak_areas = db.query(WeakArea).filter(WeakArea.user_id == user_id).all()
-        weak_areas_count = len(weak_areas)
-        
-        # Get study sessions
-        recent_sessions = db.query(StudySession)\
-            .filter(StudySession.user_id == user_id)\
-            .filter(StudySession.date >= datetime.utcnow() - timedelta(days=7))\
-            .all()
-        
-        # Burnout analysis
-        sessions_data = [
-            {
-                'duration_minutes': s.duration_minutes,
-                'focus_score': s.focus_score,
-                'date': s.date.isoformat()
-            }
-            for s in recent_sessions
-        ]
-        
-        burnout = BurnoutDetector.analyze_study_patterns(
-            sessions_data,
-            tests_data,
-            days_lookback=7
+        result = await db.execute(
+            query.order_by(TestResult.test_date.desc(), TestResult.id.desc()).limit(limit + 1)
         )
+        rows = result.all()
+        return rows[:limit], len(rows) > limit
+    
+    @staticmethod
+    async def stream_test_history(
+        user_id: Optional[int] = None,
+        school: Optional[str] = None,
+        grade: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream complete test history as NDJSON, oldest first: one user's with
+        ``user_id``, otherwise the cohort matching ``school``/``grade``.
+        
+        Rows come off a server-side cursor in batches of EXPORT_BATCH_SIZE, so
+        memory stays flat however long the history. Uses its own session,
+        which lives exactly as long as the stream.
+        """
         
-        # Next recommended chapter
-        next_chapter = None
-        if weak_areas:
-            next_chapter = weak_areas[0].chapter
-        
-        return DashboardMetrics(
-            overall_accuracy=performance.overall_accuracy,
-            test_count=len(recent_tests),
-            study_sessions=len(recent_sessions),
-            weak_areas_count=weak_areas_count,
-            burnout_score=burnout.burnout_score,
-            improvement_trend=performance.improvement_trend,
-            next_recommended_chapter=next_chapter
+        query = (
+            select(
+                TestResult.user_id, User.name, User.school, User.grade,
+                TestResult.id, TestResult.test_name, TestResult.subject,
+                TestResult.total_questions, TestResult.correct_answers,
+                TestResult.wrong_answers, TestResult.not_attempted,
+                TestResult.score, TestResult.accuracy, TestResult.time_taken,
+                TestResult.chapter_performance, TestResult.test_date
+            )
+            .join(User, User.id == TestResult.user_id)
         )
+        if user_id is not None:
+            query = query.filter(TestResult.user_id == user_id)
+        if school is not None:
+            query = query.filter(User.school == school)
+        if grade is not None:
+            query = query.filter(User.grade == grade)
+        query = query.order_by(TestResult.user_id, TestResult.test_date, TestResult.id)
+        
+        async with SessionLocal() as db:
+            result = await db.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+            async for rows in result.partitions():
+                yield "".join(
+                    json.dumps({**row._asdict(), "test_date": row.test_date.isoformat()}) + "\n"
+                    for row in rows
+                )
+    
+    @staticmethod
+    async def get_dashboard_metrics(db: AsyncSession, user_id: int) -> DashboardMetrics:
+        """Get comprehensive dashboard metrics from the user's snapshot."""
+        
+        return await DashboardService.get_metrics(db, user_id)
     
     @staticmethod
-    def get_study_recommendations(db: Session, user_id: int) -> List[Dict]:
+    async def get_study_recommendations(db: AsyncSession, user_id: int) -> List[Dict]:
         """Get personalized study recommendations."""
         
-        weak_areas = db.query(WeakArea).filter(
-            WeakArea.user_id == user_id
-        ).order_by(WeakArea.priority_score.desc()).limit(5).all()
+        weak_areas = (await db.execute(
+            select(WeakArea).filter(
+                WeakArea.user_id == user_id
+            ).order_by(WeakArea.priority_score.desc()).limit(5)
+        )).scalars().all()
         
         if not weak_areas:
             return []
@@ -1,6 +1,7 @@
 """User authentication and management service."""
 
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 from app.models import User, UserRole
 from app.schemas import UserCreate, UserResponse, UserUpdate
@@ -12,11 +13,13 @@ class UserService:
     """Service for user management and authentication."""
     
     @staticmethod
-    def create_user(db: Session, user_in: UserCreate) -> User:
+    async def create_user(db: AsyncSession, user_in: UserCreate) -> User:
         """Create a new user."""
         
         # Check if user already exists
-        existing_user = db.query(User).filter(User.email == user_in.email).first()
+        existing_user = (await db.execute(
+            select(User).filter(User.email == user_in.email)
+        )).scalars().first()
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -36,16 +39,16 @@ class UserService:
         )
         
         db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
+        await db.refresh(db_user)
         
         return db_user
     
     @staticmethod
-    def authenticate_user(db: Session, email: str, password: str) -> dict:
+    async def authenticate_user(db: AsyncSession, email: str, password: str) -> dict:
         """Authenticate user and return tokens."""
         
-        user = db.query(User).filter(User.email == email).first()
+        user = (await db.execute(select(User).filter(User.email == email))).scalars().first()
         
         if not user or not verify_password(password, user.hashed_password or ""):
             raise HTTPException(
@@ -61,16 +64,16 @@ class UserService:
         
         # Update last login
         user.last_login = datetime.utcnow()
-        db.commit()
+        await db.commit()
         
         # Generate tokens
         tokens = create_tokens_pair(user.id, user.email)
         return {**tokens, "user": UserResponse.from_orm(user)}
     
     @staticmethod
-    def get_user_by_id(db: Session, user_id: int) -> User:
+    async def get_user_by_id(db: AsyncSession, user_id: int) -> User:
         """Get user by ID."""
-        user = db.query(User).filter(User.id == user_id).first()
+        user = await db.get(User, user_id)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -79,9 +82,9 @@ class UserService:
         return user
     
     @staticmethod
-    def get_user_by_email(db: Session, email: str) -> User:
+    async def get_user_by_email(db: AsyncSession, email: str) -> User:
         """Get user by email."""
-        user = db.query(User).filter(User.email == email).first()
+        user = (await db.execute(select(User).filter(User.email == email))).scalars().first()
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -90,26 +93,26 @@ class UserService:
         return user
     
     @staticmethod
-    def update_user(db: Session, user_id: int, user_update: UserUpdate) -> User:
+    async def update_user(db: AsyncSession, user_id: int, user_update: UserUpdate) -> User:
         """Update user profile."""
         
-        user = UserService.get_user_by_id(db, user_id)
+        user = await UserService.get_user_by_id(db, user_id)
         
         update_data = user_update.dict(exclude_unset=True)
         for field, value in update_data.items():
             setattr(user, field, value)
         
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
         
         return user
     
     @staticmethod
-    def request_phone_otp(db: Session, user_id: int, phone_number: str) -> dict:
+    async def request_phone_otp(db: AsyncSession, user_id: int, phone_number: str) -> dict:
         """Request OTP for phone verification."""
         
-        user = UserService.get_user_by_id(db, user_id)
+        user = await UserService.get_user_by_id(db, user_id)
         
         # Generate OTP
         otp, expiry = OTPManager.create_otp()
@@ -123,15 +126,15 @@ class UserService:
         MockSMSService.send_otp(phone_number, otp)
         
         db.add(user)
-        db.commit()
+        await db.commit()
         
         return {"message": "OTP sent successfully", "phone": phone_number}
     
     @staticmethod
-    def verify_phone_otp(db: Session, user_id: int, otp: str) -> dict:
+    async def verify_phone_otp(db: AsyncSession, user_id: int, otp: str) -> dict:
         """Verify phone OTP."""
         
-        user = UserService.get_user_by_id(db, user_id)
+        user = await UserService.get_user_by_id(db, user_id)
         
         # Verify OTP
         if not OTPManager.verify_otp(otp, user.phone_otp, user.phone_otp_expires_at):
@@ -146,18 +149,18 @@ class UserService:
         user.phone_otp_expires_at = None
         
         db.add(user)
-        db.commit()
+        await db.commit()
         
         return {"message": "Phone verified successfully"}
     
     @staticmethod
-    def create_oauth_user(db: Session, oauth_data: dict, provider: str) -> User:
+    async def create_oauth_user(db: AsyncSession, oauth_data: dict, provider: str) -> User:
         """Create or get user from OAuth."""
         
         email = oauth_data.get('email')
         
         # Check if user exists
-        existing_user = db.query(User).filter(User.email == email).first()
+        existing_user = (await db.execute(select(User).filter(User.email == email))).scalars().first()
         if existing_user:
             # Update OAuth ID if not set
             if provider == "google" and not existing_user.google_id:
@@ -166,7 +169,7 @@ class UserService:
                 existing_user.apple_id = oauth_data.get('apple_id')
             
             db.add(existing_user)
-            db.commit()
+            await db.commit()
             return existing_user
         
         # Create new user
@@ -181,7 +184,7 @@ class UserService:
         )
         
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
+        await db.refresh(new_user)
         
         return new_user
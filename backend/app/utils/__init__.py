@@ -2,12 +2,12 @@
 
 from .helpers import (
     normalize_test_data, paginate, format_response,
-    calculate_accuracy, calculate_score
+    calculate_accuracy, calculate_score, encode_cursor, decode_cursor
 )
 from .dependencies import get_current_user, get_admin_user, get_db, security
 
 __all__ = [
     "normalize_test_data", "paginate", "format_response",
-    "calculate_accuracy", "calculate_score",
+    "calculate_accuracy", "calculate_score", "encode_cursor", "decode_cursor",
     "get_current_user", "get_admin_user", "get_db", "security"
 ]
@@ -1,7 +1,10 @@
 """Utility functions for Study Plus AI."""
 
+import base64
+import binascii
 import json
-from typing import Dict, Any, Optional
+from datetime import datetime
+from typing import Dict, Any, Optional, Tuple
 
 
 def normalize_test_data(raw_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -32,6 +35,22 @@ def paginate(query, page: int = 1, page_size: int = 10):
     return query.offset(skip).limit(page_size)
 
 
+def encode_cursor(test_date: datetime, item_id: int) -> str:
+    """Opaque keyset cursor for the row at (test_date, id)."""
+    raw = json.dumps([test_date.isoformat(), item_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of encode_cursor. Raises ValueError for a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        test_date, item_id = json.loads(raw)
+        return datetime.fromisoformat(test_date), int(item_id)
+    except (binascii.Error, TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
 def format_response(data: Any, message: Optional[str] = None, status: str = "success") -> Dict:
     """
     Format API response consistently.
@@ -0,0 +1,99 @@
+"""Concurrency benchmark: blocking Session vs AsyncSession in async routes.
+
+Builds a throwaway FastAPI app with two endpoints that run the same slow
+query: one through a synchronous SQLAlchemy Session, as the routes used to,
+and one through the async engine. It then fires concurrent requests at
+each in-process and reports throughput, while a probe keeps timing 10 ms
+sleeps to measure event-loop lag. A blocking query stalls the loop, so every
+other request on the worker (health checks, logins) waits behind it; an
+awaited one leaves the loop free. On a single core a CPU-bound SQLite query
+cannot run any faster either way, so loop lag is the number to watch there;
+against PostgreSQL, where the work happens in the server, throughput differs
+as well.
+
+Usage: python benchmark_db.py [--requests N] [--url DATABASE_URL]
+(defaults to a temporary SQLite file)
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import async_database_url
+
+SLOW_QUERIES = {
+    "postgresql": "SELECT pg_sleep(0.05)",
+    "sqlite": ("WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 200000) "
+               "SELECT count(*) FROM c"),
+}
+
+
+def build_app(url):
+    sync_engine = create_engine(url)
+    async_engine = create_async_engine(async_database_url(url))
+    SyncSession = sessionmaker(bind=sync_engine)
+    query = text(SLOW_QUERIES[sync_engine.dialect.name])
+    app = FastAPI()
+
+    @app.get("/blocking")
+    async def blocking():
+        with SyncSession() as db:
+            return {"value": db.execute(query).scalar()}
+
+    @app.get("/async")
+    async def non_blocking():
+        async with async_engine.connect() as conn:
+            return {"value": (await conn.execute(query)).scalar()}
+
+    return app, async_engine
+
+
+async def probe(done, lags, interval=0.01):
+    while not done.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def run(app, path, requests):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get(path)  # warm up connections
+        done, lags = asyncio.Event(), []
+        prober = asyncio.create_task(probe(done, lags))
+        start = time.perf_counter()
+        responses = await asyncio.gather(*(client.get(path) for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await prober
+    assert all(r.status_code == 200 for r in responses)
+    return elapsed, max(lags) if lags else elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50, help="concurrent requests per variant")
+    parser.add_argument("--url", help="database to query (a plain, synchronous URL)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        app, async_engine = build_app(url)
+        print(f"{args.requests} concurrent requests against {url.split('://')[0]}")
+        print(f"{'variant':<20} {'seconds':>8} {'req/s':>8} {'max loop lag ms':>16}")
+        for label, path in (("blocking Session", "/blocking"), ("AsyncSession", "/async")):
+            elapsed, worst_lag = await run(app, path, args.requests)
+            print(f"{label:<20} {elapsed:>8.2f} {args.requests / elapsed:>8.1f} {worst_lag * 1000:>16.1f}")
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
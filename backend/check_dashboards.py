@@ -0,0 +1,52 @@
+"""Consistency check for dashboard snapshots.
+
+Recomputes every user's dashboard metrics from the test, study-session and
+weak-area tables and compares them with what the snapshot would serve.
+Users without a snapshot are skipped; their first dashboard read builds
+one. Prints each mismatch and exits non-zero if any are found. With
+--repair, inconsistent snapshots are rebuilt from the tables.
+
+Usage: python check_dashboards.py [--user ID ...] [--repair]
+"""
+
+import argparse
+import asyncio
+import sys
+
+from sqlalchemy import select
+
+from app.db import SessionLocal, close_db
+from app.models import User
+from app.services import DashboardService
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--user", type=int, action="append", help="check only this user id (repeatable)")
+    parser.add_argument("--repair", action="store_true", help="rebuild inconsistent snapshots")
+    args = parser.parse_args()
+
+    checked = missing = bad = 0
+    async with SessionLocal() as db:
+        user_ids = args.user or (await db.execute(select(User.id).order_by(User.id))).scalars().all()
+        for user_id in user_ids:
+            report = await DashboardService.check(db, user_id)
+            checked += 1
+            missing += report["missing"]
+            if report["consistent"]:
+                continue
+            bad += 1
+            for field, values in report["mismatches"].items():
+                print(f"user {user_id}: {field} snapshot={values['snapshot']!r} recomputed={values['recomputed']!r}")
+            if args.repair:
+                await DashboardService.rebuild(db, user_id)
+                print(f"user {user_id}: rebuilt")
+    await close_db()
+
+    print(f"{checked} checked, {missing} without snapshot, {bad} inconsistent"
+          + (", repaired" if args.repair and bad else ""))
+    return 1 if bad and not args.repair else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
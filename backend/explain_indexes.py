@@ -0,0 +1,170 @@
+"""Query-plan check for the per-user composite and covering indexes.
+
+Seeds a scratch database with synthetic users, test results, study sessions
+and weak areas, then EXPLAINs the hot per-user queries. Each plan must use
+the index meant for it, without a separate sort. On PostgreSQL, queries the
+index covers must be index-only scans. Exits non-zero if any check fails.
+
+Usage: python explain_indexes.py [--rows N] [--url DATABASE_URL]
+(defaults to 200,000 test results in a temporary SQLite file; --url must
+point at an empty scratch database, whose tables it creates and fills)
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db.database import Base, async_database_url
+from app.models import User, TestResult, StudySession, WeakArea
+
+TESTS_PER_USER = 200
+SESSIONS_PER_TEST = 0.25
+WEAK_AREAS_PER_USER = 20
+
+# Row generators: a series 0..n-1 as column i, per dialect
+SERIES = {
+    "postgresql": "INSERT INTO {table} ({columns}) SELECT {values} FROM generate_series(0, {n} - 1) AS s(i)",
+    "sqlite": ("INSERT INTO {table} ({columns}) WITH RECURSIVE s(i) AS "
+               "(SELECT 0 UNION ALL SELECT i + 1 FROM s WHERE i < {n} - 1) SELECT {values} FROM s"),
+}
+MINUTES_AFTER = {
+    "postgresql": "timestamp '2024-01-01' + ({minutes}) * interval '1 minute'",
+    "sqlite": "datetime('2024-01-01', '+' || ({minutes}) || ' minutes')",
+}
+
+
+async def seed(conn, rows):
+    dialect = conn.dialect.name
+    users = max(1, rows // TESTS_PER_USER)
+
+    now = datetime.utcnow()
+    for start in range(0, users, 10000):
+        await conn.execute(insert(User), [
+            {"email": f"user{i}@example.com", "name": f"User {i}", "created_at": now, "updated_at": now}
+            for i in range(start + 1, min(start + 10000, users) + 1)
+        ])
+
+    def fill(table, n, columns):
+        return text(SERIES[dialect].format(
+            table=table, n=n, columns=", ".join(columns), values=", ".join(columns.values())
+        ))
+
+    at = lambda minutes: MINUTES_AFTER[dialect].format(minutes=minutes)
+    user = f"(i % {users}) + 1"
+    await conn.execute(fill("test_results", rows, {
+        "user_id": user, "test_name": "'Mock test'", "subject": "'Physics'",
+        "total_questions": "100", "correct_answers": "(i * 37) % 100", "wrong_answers": "100 - (i * 37) % 100",
+        "not_attempted": "0", "score": "(i * 37) % 100", "accuracy": "(i * 53) % 100",
+        "time_taken": "3600", "test_date": at("i"), "created_at": at("i"),
+    }))
+    await conn.execute(fill("study_sessions", int(rows * SESSIONS_PER_TEST), {
+        "user_id": user, "chapter": "'Optics'", "subject": "'Physics'",
+        "duration_minutes": "30 + i % 90", "focus_score": "(i * 29) % 100",
+        "date": at("i * 4"), "created_at": at("i * 4"),
+    }))
+    await conn.execute(fill("weak_areas", users * WEAK_AREAS_PER_USER, {
+        "user_id": user, "chapter": f"'Chapter ' || (i / {users})", "subject": "'Physics'",
+        "accuracy": "(i * 53) % 70", "times_attempted": "1 + i % 5", "priority_score": "(i * 31) % 100",
+        "last_updated": at("i"), "created_at": at("i"),
+    }))
+
+
+def checks(user_id):
+    """(label, statement, index, covered) for each hot per-user query."""
+    since = datetime(2024, 1, 1) + timedelta(days=30)
+    return [
+        ("test history", select(
+            TestResult.id, TestResult.test_name, TestResult.subject,
+            TestResult.score, TestResult.accuracy, TestResult.test_date,
+        ).filter(TestResult.user_id == user_id)
+         .order_by(TestResult.test_date.desc(), TestResult.id.desc()).limit(10),
+         "ix_test_results_user_date", True),
+        ("dashboard tests", select(TestResult.id, TestResult.score, TestResult.accuracy, TestResult.test_date)
+         .filter(TestResult.user_id == user_id)
+         .order_by(TestResult.test_date.desc(), TestResult.id.desc()).limit(20),
+         "ix_test_results_user_date", True),
+        ("dashboard sessions", select(
+            StudySession.id, StudySession.date, StudySession.duration_minutes, StudySession.focus_score,
+        ).filter(StudySession.user_id == user_id, StudySession.date >= since)
+         .order_by(StudySession.date, StudySession.id),
+         "ix_study_sessions_user_date", True),
+        ("recommendations", select(WeakArea).filter(WeakArea.user_id == user_id)
+         .order_by(WeakArea.priority_score.desc(), WeakArea.id).limit(5),
+         "ix_weak_areas_user_priority", False),
+    ]
+
+
+def _pg_nodes(plan):
+    yield plan
+    for child in plan.get("Plans", ()):
+        yield from _pg_nodes(child)
+
+
+async def explain(conn, statement):
+    """Plan as (text, [(node, index)])."""
+    sql = str(statement.compile(conn.sync_connection, compile_kwargs={"literal_binds": True}))
+    if conn.dialect.name == "postgresql":
+        plan = (await conn.execute(text("EXPLAIN (FORMAT JSON) " + sql))).scalar()
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        nodes = [(n["Node Type"], n.get("Index Name")) for n in _pg_nodes(plan[0]["Plan"])]
+        return " -> ".join(f"{n} ({i})" if i else n for n, i in nodes), nodes
+    details = [row[3] for row in (await conn.execute(text("EXPLAIN QUERY PLAN " + sql))).all()]
+    nodes = []
+    for detail in details:
+        index = detail.split(" INDEX ", 1)[1].split()[0] if " INDEX " in detail else None
+        node = "Sort" if "TEMP B-TREE" in detail else ("Index Only Scan" if "COVERING INDEX" in detail else "Scan")
+        nodes.append((node, index))
+    return "; ".join(details), nodes
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000, help="test results to generate")
+    parser.add_argument("--url", help="empty scratch database (a plain, synchronous URL)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url or f"sqlite:///{os.path.join(tmp, 'explain.db')}"
+        engine = create_async_engine(async_database_url(url))
+        dialect = engine.dialect.name
+
+        start = time.perf_counter()
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await seed(conn, args.rows)
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.execute(text("VACUUM ANALYZE" if dialect == "postgresql" else "ANALYZE"))
+        print(f"seeded {args.rows:,} test results into {dialect} in {time.perf_counter() - start:.1f}s")
+
+        failures = 0
+        async with engine.connect() as conn:
+            user_id = max(1, args.rows // TESTS_PER_USER // 2)
+            for label, statement, index, covered in checks(user_id):
+                plan, nodes = await explain(conn, statement)
+                problems = []
+                if index not in {i for _, i in nodes}:
+                    problems.append(f"does not use {index}")
+                if any(node in ("Sort", "Incremental Sort") for node, _ in nodes):
+                    problems.append("sorts instead of reading the index in order")
+                if covered and dialect == "postgresql" and ("Index Only Scan", index) not in nodes:
+                    problems.append("is not an index-only scan")
+                failures += bool(problems)
+                print(f"{'FAIL' if problems else 'ok':<4} {label:<20} {plan}")
+                for problem in problems:
+                    print(f"     {label} {problem}")
+        await engine.dispose()
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,221 @@
+"""In-process caches shared by the Jas AI helpers."""
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Thread-safe LRU cache with a size bound, per-entry TTL and counters."""
+
+    def __init__(self, max_size=1024, ttl=3600.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def peek(self, key):
+        """Like ``get`` but without touching recency or hit/miss counters."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                return None
+            return value
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def keys(self):
+        with self._lock:
+            return list(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+
+
+def simhash(text, bits=64):
+    """64-bit SimHash of a text's word unigrams and bigrams.
+
+    Texts that differ by a few words land a small Hamming distance apart.
+    Returns None for texts too short to fingerprint meaningfully.
+    """
+    tokens = _TOKEN_RE.findall(text.casefold())
+    if len(tokens) < 3:
+        return None
+    features = tokens + [a + " " + b for a, b in zip(tokens, tokens[1:])]
+    weights = [0] * bits
+    for feature in features:
+        h = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "big")
+        for i in range(bits):
+            weights[i] += 1 if h >> i & 1 else -1
+    return sum(1 << i for i in range(bits) if weights[i] > 0)
+
+
+def numbers(text):
+    """The numeric tokens of a text, in order."""
+    return tuple(_NUMBER_RE.findall(text))
+
+
+class ResponseCache:
+    """Jas AI replies keyed by (mode, normalized message, model).
+
+    Exact lookups collapse whitespace only, so template replies that quote
+    the question stay correct. Callers may also ask for a near-duplicate
+    match: messages are fingerprinted with SimHash, and any cached reply for
+    the same mode and model within ``max_distance`` bits whose message has
+    exactly the same numbers counts as a hit (questions that differ only in
+    a value are otherwise near-identical).
+    Fingerprints are split into four 16-bit bands, so with a distance of 3
+    or less at least one band is identical and only entries sharing a band
+    need to be compared.
+    """
+
+    BANDS = 4
+    BAND_BITS = 16
+
+    def __init__(self, max_size=4096, ttl=3600.0, modes=None, fuzzy=False, max_distance=3):
+        self.entries = LRUCache(max_size=max_size, ttl=ttl)
+        self.modes = None if modes is None else frozenset(modes)
+        self.fuzzy = fuzzy
+        self.max_distance = max_distance
+        self.fuzzy_hits = 0
+        self._fingerprints = {}
+        self._bands = {}
+        self._lock = threading.Lock()
+
+    def enabled(self, mode):
+        return self.modes is None or mode in self.modes
+
+    @staticmethod
+    def _key(mode, message, model):
+        return (mode, " ".join(message.split()), model)
+
+    def _band_keys(self, fingerprint):
+        mask = (1 << self.BAND_BITS) - 1
+        return [(i, fingerprint >> (i * self.BAND_BITS) & mask) for i in range(self.BANDS)]
+
+    def get(self, mode, message, model, fuzzy=False):
+        if not self.enabled(mode):
+            return None
+        key = self._key(mode, message, model)
+        value = self.entries.get(key)
+        if value is not None or not (fuzzy and self.fuzzy):
+            return value
+
+        fingerprint = simhash(message)
+        if fingerprint is None:
+            return None
+        values = numbers(message)
+        with self._lock:
+            candidates = set()
+            for band in self._band_keys(fingerprint):
+                candidates.update(self._bands.get(band, ()))
+            for candidate in candidates:
+                if candidate[0] != mode or candidate[2] != model:
+                    continue
+                candidate_fingerprint, candidate_values = self._fingerprints[candidate]
+                if candidate_values != values:
+                    continue
+                if bin(candidate_fingerprint ^ fingerprint).count("1") > self.max_distance:
+                    continue
+                value = self.entries.peek(candidate)
+                if value is None:
+                    self._forget(candidate)
+                    continue
+                self.fuzzy_hits += 1
+                return value
+        return None
+
+    def set(self, mode, message, model, reply):
+        if not self.enabled(mode) or not reply:
+            return
+        key = self._key(mode, message, model)
+        self.entries.set(key, reply)
+        if not self.fuzzy:
+            return
+        fingerprint = simhash(message)
+        if fingerprint is None:
+            return
+        with self._lock:
+            self._forget(key)
+            self._fingerprints[key] = (fingerprint, numbers(message))
+            for band in self._band_keys(fingerprint):
+                self._bands.setdefault(band, set()).add(key)
+            if len(self._fingerprints) > 2 * self.entries.max_size:
+                # Drop fingerprints whose entries the LRU has evicted.
+                live = set(self.entries.keys())
+                for stale in [k for k in self._fingerprints if k not in live]:
+                    self._forget(stale)
+
+    def _forget(self, key):
+        entry = self._fingerprints.pop(key, None)
+        if entry is None:
+            return
+        fingerprint = entry[0]
+        for band in self._band_keys(fingerprint):
+            keys = self._bands.get(band)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._bands[band]
+
+    def stats(self):
+        stats = self.entries.stats()
+        lookups = stats["hits"] + stats["misses"]
+        hits = stats["hits"] + self.fuzzy_hits
+        stats.update({
+            "exact_hits": stats.pop("hits"),
+            "fuzzy_hits": self.fuzzy_hits,
+            "misses": stats["misses"] - self.fuzzy_hits,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "modes": sorted(self.modes) if self.modes is not None else "all",
+            "fuzzy": self.fuzzy,
+        })
+        return stats
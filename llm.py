@@ -0,0 +1,166 @@
+"""Managed client for an OpenAI-compatible chat completions endpoint.
+
+One ``LLMClient`` is shared by every request in a worker process. It keeps a
+keep-alive connection pool to the upstream API, caps the number of requests
+in flight, and coalesces identical concurrent prompts so a burst of the
+same homework question costs one upstream call. Point ``base_url`` at a
+local server to test without touching the real API.
+"""
+
+import json
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class LLMError(Exception):
+    """Raised when the upstream model cannot produce a reply."""
+
+
+class _Call:
+    """A single upstream call that concurrent identical requests wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class LLMClient:
+    """Pooled, concurrency-limited, single-flight chat completions client."""
+
+    def __init__(self, api_key, base_url="https://api.openai.com/v1", model="gpt-3.5-turbo",
+                 timeout=30.0, max_in_flight=8, pool_size=10):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Authorization": f"Bearer {api_key}"})
+
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self.max_in_flight = max_in_flight
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.upstream_calls = 0
+        self.coalesced = 0
+        self.rejected = 0
+
+    def _post(self, payload, stream=False):
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self.rejected += 1
+            raise LLMError("Too many LLM requests in flight")
+        try:
+            with self._lock:
+                self.upstream_calls += 1
+            response = self.session.post(
+                f"{self.base_url}/chat/completions", json=payload,
+                timeout=self.timeout, stream=stream,
+            )
+            try:
+                response.raise_for_status()
+            except requests.HTTPError:
+                response.close()  # Return the connection to the pool
+                raise
+            return response
+        except requests.RequestException as e:
+            self._slots.release()
+            raise LLMError(str(e))
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _payload(self, messages, **params):
+        return dict({"model": self.model, "messages": messages}, **params)
+
+    def complete(self, messages, key=None, **params):
+        """Return the reply text. Calls sharing ``key`` are coalesced."""
+        if key is None:
+            return self._complete(messages, **params)
+
+        key = (key, self.model, json.dumps(params, sort_keys=True))
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            # The leader may wait up to ``timeout`` for a slot and then up to
+            # ``timeout`` on the upstream call; give it the whole budget.
+            call.done.wait(2 * self.timeout)
+            if call.error is not None:
+                raise call.error
+            if call.result is None:
+                raise LLMError("Timed out waiting for a coalesced LLM call")
+            return call.result
+
+        try:
+            call.result = self._complete(messages, **params)
+        except Exception as e:
+            call.error = e if isinstance(e, LLMError) else LLMError(str(e))
+            raise call.error
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def _complete(self, messages, **params):
+        response = self._post(self._payload(messages, **params))
+        try:
+            data = response.json()
+        finally:
+            response.close()
+            self._slots.release()
+        try:
+            return data["choices"][0]["message"]["content"].strip()
+        except (KeyError, IndexError, TypeError, AttributeError):
+            raise LLMError("Malformed completion response")
+
+    def stream(self, messages, **params):
+        """Yield reply text deltas as the upstream model produces them.
+
+        Raises LLMError if the stream fails or ends without ``[DONE]``, so a
+        truncated reply is never mistaken for a complete one.
+        """
+        response = self._post(self._payload(messages, stream=True, **params), stream=True)
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    return
+                try:
+                    delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+                except (ValueError, KeyError, IndexError):
+                    continue
+                if delta:
+                    yield delta
+            # The connection closed before the reply was complete
+            raise LLMError("Stream ended before [DONE]")
+        except requests.RequestException as e:
+            raise LLMError(str(e))
+        finally:
+            response.close()
+            self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "model": self.model,
+                "max_in_flight": self.max_in_flight,
+                "upstream_calls": self.upstream_calls,
+                "coalesced": self.coalesced,
+                "rejected": self.rejected,
+                "pending_keys": len(self._calls),
+            }
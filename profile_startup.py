@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+"""Report what importing the Flask app costs a gunicorn worker.
+
+Runs ``import app`` in fresh interpreters and prints:
+
+* the slowest modules from ``python -X importtime`` (cumulative time), and
+* wall-clock import time and peak RSS of the lazy app, against the same
+  import with SymPy and openai loaded eagerly as the app used to do.
+
+Usage: python profile_startup.py [--top N] [--runs N]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+MEASURE = """
+import json, resource, sys, time
+start = time.perf_counter()
+for name in sys.argv[1:]:
+    try:
+        __import__(name)
+    except Exception:
+        pass
+import app
+elapsed = time.perf_counter() - start
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"seconds": elapsed, "rss_mb": rss_kb / 1024}))
+"""
+
+
+def import_profile(top):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), name.strip()))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+def measure(preload, runs):
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", MEASURE, *preload],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    samples.sort(key=lambda s: s["seconds"])
+    return samples[len(samples) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--top", type=int, default=15, help="modules to list")
+    parser.add_argument("--runs", type=int, default=5, help="samples per scenario")
+    args = parser.parse_args()
+
+    print(f"Slowest imports under 'import app' (top {args.top}, cumulative):")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for cumulative_us, self_us, name in import_profile(args.top):
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
+
+    print()
+    print(f"Worker boot (median of {args.runs}):")
+    print(f"{'scenario':<28} {'import s':>9} {'peak RSS MB':>12}")
+    for label, preload in (("lazy (current)", []), ("eager sympy + openai", ["sympy", "openai"])):
+        sample = measure(preload, args.runs)
+        print(f"{label:<28} {sample['seconds']:>9.3f} {sample['rss_mb']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Focus scoring for study hours, one value at a time or a whole batch.
+
+``score`` backs ``/calculate``. ``score_records`` backs
+``/calculate/batch``: it takes an iterable of ``(id, hours)`` records, which
+may be a request body still being read, and yields NDJSON result lines. It
+works through the records in fixed-size chunks, so memory stays flat however
+many records arrive. Each chunk is scored with NumPy array operations when
+NumPy is installed, and with the scalar code otherwise. NumPy is imported on
+the first batch rather than at app start.
+"""
+
+import csv
+import importlib.util
+import io
+import itertools
+import json
+import math
+
+NUMPY_AVAILABLE = importlib.util.find_spec("numpy") is not None
+
+FULL_FOCUS_HOURS = 16
+LOW_HOURS = 6
+HIGH_HOURS = 12
+
+TIPS = (
+    "Low consistency. Try focused short sessions.",
+    "Balanced study detected. Maintain breaks.",
+    "Overstudy detected. AI recommends rest.",
+)
+_TIPS_JSON = tuple(json.dumps(tip) for tip in TIPS)
+
+CHUNK_SIZE = 8192
+
+
+def tip_bucket(hours):
+    if hours < LOW_HOURS:
+        return 0
+    if hours <= HIGH_HOURS:
+        return 1
+    return 2
+
+
+def score(hours):
+    hours = float(hours)
+    focus = min((hours / FULL_FOCUS_HOURS) * 100, 100)
+    return {"hours": hours, "focus": round(focus, 2), "tip": TIPS[tip_bucket(hours)]}
+
+
+def _score_chunk(hours):
+    """Return ``(focus, bucket)`` lists for a list of floats."""
+    if not NUMPY_AVAILABLE:
+        return ([round(min((h / FULL_FOCUS_HOURS) * 100, 100), 2) for h in hours],
+                [tip_bucket(h) for h in hours])
+
+    import numpy as np
+
+    values = np.asarray(hours, dtype=np.float64)
+    focus = np.round(np.minimum(values / FULL_FOCUS_HOURS * 100, 100), 2)
+    # 0 below LOW_HOURS, 1 up to and including HIGH_HOURS, 2 above.
+    buckets = (values >= LOW_HOURS).astype(np.int8) + (values > HIGH_HOURS)
+    return focus.tolist(), buckets.tolist()
+
+
+def _line(index, record_id, fields):
+    prefix = f'{{"index":{index}'
+    if record_id is not None:
+        prefix += f',"id":{json.dumps(record_id)}'
+    return prefix + fields + "}\n"
+
+
+def _flush(chunk):
+    indexes, ids, hours = zip(*chunk)
+    focus, buckets = _score_chunk(list(hours))
+    return "".join(
+        _line(i, record_id, f',"hours":{h!r},"focus":{f!r},"tip":{_TIPS_JSON[b]}')
+        for i, record_id, h, f, b in zip(indexes, ids, hours, focus, buckets)
+    )
+
+
+def score_records(records, chunk_size=CHUNK_SIZE):
+    """Yield one NDJSON result line per ``(id, hours)`` record, in order.
+
+    A record whose hours are not a finite number yields an ``error`` line in
+    its place instead of failing the batch.
+    """
+    chunk = []
+    for index, (record_id, raw) in enumerate(records):
+        try:
+            hours = float(raw)
+            if not math.isfinite(hours):
+                raise ValueError(f"hours must be finite, got {raw!r}")
+        except (TypeError, ValueError) as e:
+            if chunk:
+                yield _flush(chunk)
+                chunk = []
+            yield _line(index, record_id, f',"error":{json.dumps(str(e))}')
+            continue
+        chunk.append((index, record_id, hours))
+        if len(chunk) >= chunk_size:
+            yield _flush(chunk)
+            chunk = []
+    if chunk:
+        yield _flush(chunk)
+
+
+# ---------------- input formats ----------------
+
+def _record(item):
+    """``(id, hours)`` from a bare value or an object with ``hours``."""
+    if isinstance(item, dict):
+        return item.get("id"), item.get("hours")
+    return None, item
+
+
+def json_records(items):
+    for item in items:
+        yield _record(item)
+
+
+def ndjson_records(lines):
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            item = line  # reported as unparseable hours
+        yield _record(item)
+
+
+def csv_records(lines):
+    """Records from CSV: either one bare hours column, or a header row
+    naming an ``hours`` column and optionally an ``id`` column."""
+    rows = csv.reader(lines)
+    first = next(rows, None)
+    if first is None:
+        return
+    header = [cell.strip().lower() for cell in first]
+    if "hours" in header:
+        hours_col = header.index("hours")
+        id_col = header.index("id") if "id" in header else None
+    else:
+        hours_col, id_col = 0, None
+        rows = itertools.chain([first], rows)
+    for row in rows:
+        if not row:
+            continue
+        hours = row[hours_col] if hours_col < len(row) else None
+        record_id = row[id_col] if id_col is not None and id_col < len(row) else None
+        yield record_id, hours
+
+
+def text_lines(stream):
+    """Decode a binary request stream line by line as it arrives."""
+    return io.TextIOWrapper(stream, encoding="utf-8", newline="")
@@ -0,0 +1,365 @@
+"""Symbolic doubt solving for Jas AI in a pool of worker processes.
+
+SymPy can spend minutes on a pathological input (a high-degree system,
+nested radicals), so the web process never calls it directly. Jobs are
+handed to a small pool of pre-warmed worker processes that already have
+SymPy imported. Each job gets a wall-clock deadline, and each worker a CPU
+budget per job; a worker that overruns is killed and replaced, and the
+caller gets a fast ``SolverTimeout`` instead of a stalled request. The
+number of jobs waiting for a worker is bounded, beyond which ``SolverBusy``
+is raised immediately.
+
+Results are memoised per worker in a ``SymbolicCache`` keyed by the
+canonical expression tree, optionally backed by a SQLite file shared by all
+workers.
+"""
+
+import multiprocessing
+import queue
+import re
+import threading
+import time
+
+from cache import LRUCache
+from router import IntentRouter
+
+try:
+    import resource
+except ImportError:  # Not available on Windows.
+    resource = None
+
+
+class SolverBusy(Exception):
+    """Raised when too many symbolic jobs are already queued."""
+
+
+class SolverTimeout(Exception):
+    """Raised when a symbolic job exceeds its time budget."""
+
+
+# ---------------- result cache ----------------
+
+class SymbolicCache:
+    """Symbolic results keyed by operation and canonical expression tree.
+
+    Keys use ``sympy.srepr`` of the parsed expression, so textual variants
+    of the same expression ("x^2+3*x", "3*x + x**2") share one entry. An
+    in-memory LRU sits in front of an optional SQLite file, which is shared
+    by all workers and survives restarts.
+    """
+
+    def __init__(self, max_size=2048, ttl=86400.0, path=None, max_disk_entries=100000):
+        self.memory = LRUCache(max_size=max_size, ttl=ttl)
+        self.ttl = ttl
+        self.path = path
+        self.max_disk_entries = max_disk_entries
+        self._db = None
+        self._writes = 0
+
+    def _connect(self):
+        if self._db is None and self.path:
+            import sqlite3
+
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS symbolic_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db = db
+        return self._db
+
+    def get(self, key):
+        """Return ``(value, status)`` where status is memory, disk or miss."""
+        value = self.memory.get(key)
+        if value is not None:
+            return value, "memory"
+        db = self._connect()
+        if db is not None:
+            try:
+                row = db.execute(
+                    "SELECT value FROM symbolic_cache WHERE key = ? AND expires_at > ?",
+                    (key, time.time()),
+                ).fetchone()
+            except Exception:
+                row = None
+            if row is not None:
+                self.memory.set(key, row[0])
+                return row[0], "disk"
+        return None, "miss"
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        db = self._connect()
+        if db is None:
+            return
+        try:
+            db.execute(
+                "INSERT OR REPLACE INTO symbolic_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + self.ttl),
+            )
+            self._writes += 1
+            if self._writes % 500 == 0:
+                self._prune(db)
+        except Exception:
+            pass
+
+    def _prune(self, db):
+        db.execute("DELETE FROM symbolic_cache WHERE expires_at <= ?", (time.time(),))
+        db.execute(
+            "DELETE FROM symbolic_cache WHERE key IN ("
+            "SELECT key FROM symbolic_cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,),
+        )
+
+
+def _cached(cache, key, compute):
+    if cache is None:
+        return compute(), "off"
+    value, status = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value)
+    return value, status
+
+
+# ---------------- work done inside the pool ----------------
+
+DERIVATIVE_OF = re.compile(r'of (.+)', re.I)
+DERIVATIVE_NOISE = re.compile(r'(find|calculate|the|derivative|derivative of|d/dx|differentiat(e|ion))', re.I)
+SOLVE_FOR = re.compile(r'solve (.+) for (\w+)', re.I)
+SOLVE_WORD = re.compile(r'solve', re.I)
+
+
+def derivative_text(message):
+    """The expression to differentiate, with the question's wording removed."""
+    m = DERIVATIVE_OF.search(message)
+    expr_text = m.group(1) if m else message
+    return DERIVATIVE_NOISE.sub('', expr_text).strip(' .:?')
+
+
+def derivative_reply(message, cache=None):
+    """Return ``(reply, cache_status)`` for a derivative question."""
+    import sympy as sp
+
+    expr_text = derivative_text(message)
+    x = sp.symbols('x')
+    expr = sp.sympify(expr_text, locals={'x': x})
+
+    def compute():
+        deriv = sp.diff(expr, x)
+
+        # Attempt to show a simple step for polynomials
+        steps = ''
+        try:
+            term_steps = []
+            for term in sp.expand(expr).as_ordered_terms():
+                if term.has(x):
+                    coeff, exp = term.as_coeff_exponent(x)
+                    term_steps.append(f"d/dx({term}) = {coeff*exp}*x**{exp-1}")
+            if term_steps:
+                steps = 'Stepwise: ' + '; '.join(term_steps) + '\n'
+        except Exception:
+            steps = ''
+
+        return (f"Derivative of {str(expr)} w.r.t x is: {str(deriv)}\n\n"
+                f"{steps}Result (simplified): {str(sp.simplify(deriv))}")
+
+    return _cached(cache, f"derivative:{sp.srepr(expr)}", compute)
+
+
+def solve_reply(message, cache=None):
+    """Return ``(reply, cache_status)`` for a solve/equation question."""
+    import sympy as sp
+
+    # Extract likely equation or expression
+    m = SOLVE_FOR.search(message)
+    if m:
+        expr_text = m.group(1)
+        var = m.group(2)
+        var_sym = sp.symbols(var)
+        expr = sp.sympify(expr_text)
+        key = f"solve:{sp.srepr(expr)}:{var}"
+        compute = lambda: f"Solution: {sp.solve(expr, var_sym)}"
+    else:
+        # try generic solve
+        expr_text = SOLVE_WORD.sub('', message).strip()
+        expr = sp.sympify(expr_text)
+        key = f"solve:{sp.srepr(expr)}"
+        compute = lambda: f"Solution: {sp.solve(expr)}"
+
+    return _cached(cache, key, compute)
+
+
+# Symbolic strategies, tried in registration order. Register more with
+# ``symbolic_router.register(intent, handler, keywords=...)``; a handler
+# takes ``(message, cache)`` and returns ``(reply, cache_status)``.
+symbolic_router = IntentRouter()
+symbolic_router.register("derivative", derivative_reply, keywords=("derivative", "differentiat", "d/dx"))
+symbolic_router.register("solve", solve_reply, keywords=("solve", "equation"))
+
+
+def solve_doubt(message, cache=None):
+    """Try each matching symbolic strategy in turn.
+
+    Returns ``(reply, cache_status)``; reply is None if no strategy applies.
+    """
+    for route in symbolic_router.match(message):
+        try:
+            return route.handler(message, cache)
+        except Exception:
+            continue
+    return None, "miss"
+
+
+def _limit_cpu(seconds):
+    if resource is None or not seconds:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    used = int(usage.ru_utime + usage.ru_stime) + 1
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = used + int(seconds)
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    try:
+        # The kernel sends SIGXCPU, which kills the worker, once it has
+        # burnt ``seconds`` more CPU time than it had before this job.
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+    except (ValueError, OSError):
+        pass
+
+
+def _worker_main(conn, cpu_seconds, cache_options):
+    import sympy  # noqa: F401  (pre-warm: pay the import once per worker)
+
+    cache = SymbolicCache(**cache_options) if cache_options is not None else None
+
+    conn.send(("ready", None))
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        _limit_cpu(cpu_seconds)
+        try:
+            conn.send(("ok", solve_doubt(job, cache)))
+        except Exception as e:
+            conn.send(("error", str(e)))
+
+
+# ---------------- pool used by the web process ----------------
+
+class _Worker:
+    def __init__(self, ctx, cpu_seconds, cache_options):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main, args=(child_conn, cpu_seconds, cache_options), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+
+    def wait_ready(self, timeout):
+        if not self.ready:
+            if not self.conn.poll(timeout):
+                return False
+            self.conn.recv()
+            self.ready = True
+        return True
+
+    def kill(self):
+        try:
+            self.process.kill()
+            self.process.join(1)
+        except Exception:
+            pass
+        self.conn.close()
+
+
+class SolverPool:
+    """Fixed set of SymPy worker processes with per-job time limits."""
+
+    def __init__(self, workers=2, timeout=5.0, cpu_seconds=None, max_queue=8,
+                 cache_options=None):
+        self.workers = workers
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds if cpu_seconds is not None else timeout
+        self.max_queue = max_queue
+        # Keyword arguments for each worker's SymbolicCache, or None to
+        # disable caching. Workers report the cache outcome of every job so
+        # hit rates can be tracked here in the web process.
+        self.cache_options = cache_options
+        self.cache_counts = {"memory": 0, "disk": 0, "miss": 0}
+
+        # "spawn" keeps the children free of the web server's threads and
+        # sockets; they only import this module and SymPy.
+        self._ctx = multiprocessing.get_context("spawn")
+        self._idle = queue.Queue()
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._started = False
+
+    def start(self):
+        with self._start_lock:
+            if self._started:
+                return
+            for _ in range(self.workers):
+                self._idle.put(_Worker(self._ctx, self.cpu_seconds, self.cache_options))
+            self._started = True
+
+    def _replace(self, worker):
+        worker.kill()
+        self._idle.put(_Worker(self._ctx, self.cpu_seconds, self.cache_options))
+
+    def solve(self, message):
+        """Run ``solve_doubt(message)`` in the pool and return its reply."""
+        self.start()
+        if not self._slots.acquire(blocking=False):
+            raise SolverBusy("Too many symbolic jobs queued")
+        try:
+            deadline = time.monotonic() + self.timeout
+            try:
+                worker = self._idle.get(timeout=self.timeout)
+            except queue.Empty:
+                raise SolverTimeout("No solver worker became free in time")
+
+            try:
+                if not worker.wait_ready(max(0, deadline - time.monotonic())):
+                    self._idle.put(worker)
+                    raise SolverTimeout("Solver worker is still starting")
+                worker.conn.send(message)
+                if not worker.conn.poll(max(0, deadline - time.monotonic())):
+                    self._replace(worker)
+                    raise SolverTimeout("Symbolic job exceeded its time limit")
+                status, result = worker.conn.recv()
+            except (EOFError, OSError):
+                # The worker died mid-job, typically SIGXCPU from its CPU limit.
+                self._replace(worker)
+                raise SolverTimeout("Symbolic job exceeded its CPU limit")
+
+            self._idle.put(worker)
+            if status != "ok":
+                return None
+            reply, cache_status = result
+            if reply is not None and cache_status in self.cache_counts:
+                with self._stats_lock:
+                    self.cache_counts[cache_status] += 1
+            return reply
+        finally:
+            self._slots.release()
+
+    def stats(self):
+        counts = dict(self.cache_counts)
+        lookups = sum(counts.values())
+        hits = counts["memory"] + counts["disk"]
+        return {
+            "workers": self.workers,
+            "cache_enabled": self.cache_options is not None,
+            "cache_memory_hits": counts["memory"],
+            "cache_disk_hits": counts["disk"],
+            "cache_misses": counts["miss"],
+            "cache_hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
@@ -1,8 +1,13 @@
 let chart = null;
+let plans = [];
+let plansRevision = null;
+const PLAN_SYNC_INTERVAL = 30000;
 
 document.addEventListener("DOMContentLoaded", function() {
     console.log("App initializing...");
     loadPlans();
+    setInterval(syncPlans, PLAN_SYNC_INTERVAL);
+    window.addEventListener("online", syncPlans);
 });
 
 function scrollTo(id) {
@@ -39,7 +44,8 @@ function addPlan() {
             document.getElementById("subject").value = "";
             document.getElementById("hours").value = "";
             document.getElementById("date").value = "";
-            loadPlans();
+            plans.push(data.plan);
+            renderPlans();
         } else {
             alert("Error adding plan: " + (data.error || "Unknown error"));
         }
@@ -52,35 +58,73 @@ function addPlan() {
 
 function loadPlans() {
     fetch("/api/plans")
-        .then(response => response.json())
-        .then(plans => {
-            const listElement = document.getElementById("plansList");
-            
-            if (!plans || plans.length === 0) {
-                listElement.innerHTML = '<p style="text-align:center;color:#999;">No plans yet. Create one above!</p>';
-                return;
-            }
-
-            listElement.innerHTML = plans.map((plan, index) => `
-                <div class="plan-item ${plan.completed ? 'completed' : ''}">
-                    <div class="plan-info">
-                        <div class="subject">${escapeHtml(plan.subject)}</div>
-                        <div class="meta">📅 ${plan.date} | ⏱️ ${plan.hours}h</div>
-                    </div>
-                    <div class="plan-actions">
-                        <button class="btn-done" onclick="toggleComplete(${index})">
-                            ${plan.completed ? '✓' : 'Done'}
-                        </button>
-                        <button class="btn-delete" onclick="deletePlan(${index})">Delete</button>
-                    </div>
-                </div>
-            `).join("");
+        .then(response => {
+            plansRevision = parseInt(response.headers.get("X-Plans-Revision"), 10);
+            return response.json();
+        })
+        .then(data => {
+            plans = data || [];
+            renderPlans();
         })
         .catch(error => {
             console.error("Error loading plans:", error);
         });
 }
 
+// Fetch only what changed since the last revision we saw and patch it in.
+function syncPlans() {
+    if (plansRevision === null || isNaN(plansRevision)) {
+        loadPlans();
+        return;
+    }
+    fetch(`/api/plans/changes?since=${plansRevision}`)
+        .then(response => response.json())
+        .then(data => {
+            if (data.reset) {
+                plans = [];
+            }
+            if (!data.changes.length && !data.reset) {
+                return;
+            }
+            const byId = new Map(plans.map(plan => [plan.id, plan]));
+            data.changes.forEach(change => {
+                if (change.op === "delete") {
+                    byId.delete(change.id);
+                } else {
+                    byId.set(change.plan.id, change.plan);
+                }
+            });
+            plans = Array.from(byId.values()).sort((a, b) => a.id - b.id);
+            plansRevision = data.revision;
+            renderPlans();
+        })
+        .catch(error => console.error("Error syncing plans:", error));
+}
+
+function renderPlans() {
+    const listElement = document.getElementById("plansList");
+
+    if (plans.length === 0) {
+        listElement.innerHTML = '<p style="text-align:center;color:#999;">No plans yet. Create one above!</p>';
+        return;
+    }
+
+    listElement.innerHTML = plans.map(plan => `
+        <div class="plan-item ${plan.completed ? 'completed' : ''}">
+            <div class="plan-info">
+                <div class="subject">${escapeHtml(plan.subject)}</div>
+                <div class="meta">📅 ${plan.date} | ⏱️ ${plan.hours}h</div>
+            </div>
+            <div class="plan-actions">
+                <button class="btn-done" onclick="toggleComplete(${plan.id})">
+                    ${plan.completed ? '✓' : 'Done'}
+                </button>
+                <button class="btn-delete" onclick="deletePlan(${plan.id})">Delete</button>
+            </div>
+        </div>
+    `).join("");
+}
+
 function toggleComplete(id) {
     fetch(`/api/plans/${id}`, {
         method: "PUT",
@@ -88,7 +132,14 @@ function toggleComplete(id) {
         body: JSON.stringify({ completed: true })
     })
     .then(response => response.json())
-    .then(() => loadPlans())
+    .then(data => {
+        if (data.success) {
+            plans = plans.map(plan => plan.id === id ? data.plan : plan);
+            renderPlans();
+        } else {
+            loadPlans();
+        }
+    })
     .catch(error => console.error("Error:", error));
 }
 
@@ -96,7 +147,11 @@ function deletePlan(id) {
     if (confirm("Delete this plan?")) {
         fetch(`/api/plans/${id}`, { method: "DELETE" })
             .then(response => response.json())
-            .then(() => loadPlans())
+            .then(data => {
+                // A 404 means it is already gone, so drop it either way.
+                plans = plans.filter(plan => plan.id !== id);
+                renderPlans();
+            })
             .catch(error => console.error("Error:", error));
     }
 }
@@ -1,8 +1,10 @@
-const CACHE_NAME = 'study-plus-ai-v1';
+// Stylesheets and scripts are linked by fingerprinted /assets/ URLs that
+// the browser already caches forever, so only the page shell is precached.
+// The shell itself is fetched network-first: after a deploy it links to the
+// new fingerprints, and the server no longer serves the old ones.
+const CACHE_NAME = 'study-plus-ai-v4';
 const urlsToCache = [
   '/',
-  '/static/style.css',
-  '/static/script.js',
   'https://cdn.jsdelivr.net/npm/chart.js'
 ];
 
@@ -38,6 +40,35 @@ self.addEventListener('fetch', (event) => {
     return;
   }
 
+  // API data goes straight to the network: plan lists revalidate with
+  // their ETag and sync through /api/plans/changes, so a cached copy
+  // would only ever be stale.
+  if (new URL(event.request.url).pathname.startsWith('/api/')) {
+    return;
+  }
+
+  // Pages: network first, falling back to the cached shell when offline
+  if (event.request.mode === 'navigate') {
+    event.respondWith(
+      fetch(event.request)
+        .then((response) => {
+          if (response && response.status === 200) {
+            const responseToCache = response.clone();
+            caches.open(CACHE_NAME)
+              .then((cache) => {
+                cache.put(event.request, responseToCache);
+              });
+          }
+          return response;
+        })
+        .catch(() => {
+          return caches.match(event.request)
+            .then((response) => response || caches.match('/'));
+        })
+    );
+    return;
+  }
+
   event.respondWith(
     caches.match(event.request)
       .then((response) => {
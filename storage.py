@@ -0,0 +1,1030 @@
+"""File-backed storage for study plans and Jas AI sessions.
+
+Plans are kept as a snapshot file plus an append-only journal: every
+mutation appends a single JSON line to ``<path>.journal`` instead of
+rewriting the whole plan file, so a write costs O(1) regardless of how many
+plans exist. Reads are served from an in-memory snapshot that is built once
+by loading ``<path>`` and replaying the journal on top of it. A background
+thread folds the journal back into the snapshot file once it grows past
+``compact_threshold`` records.
+
+Every plan gets a monotonic ``id`` that is never reused, and the in-memory
+snapshot is a dict keyed by it, so lookups, updates and deletes are O(1)
+and an id keeps naming the same plan after others are deleted. A delete is
+journaled as a tombstone record for that id; the snapshot file records
+``next_id`` so ids stay unique across compactions.
+
+Alongside it the store maintains secondary indexes, updated on every
+applied record: a list of ``(date, id)`` pairs kept sorted with ``bisect``,
+a hash of subject to ids, and the set of completed ids. ``PlanStore.query``
+uses them so a filtered page costs O(matches) rather than a scan of every
+plan ever created.
+
+Each applied record also bumps a store-wide ``revision`` and stamps the
+plan it touched with it, deletes included (the tombstones). Clients that
+remember the revision they last saw ask ``PlanStore.changes`` for just
+what moved since then. Tombstones are kept up to ``max_tombstones``; a
+client further behind than that is told to reload in full.
+
+Jas AI conversations are sharded into one append-only JSON-lines file per
+session under a directory, so a chat turn touches only that conversation.
+Retention limits and gzip compression of cold sessions keep the directory
+from growing without bound.
+
+The app runs under gunicorn with several worker processes sharing these
+files, so writers are serialised with ``flock``, whole files are replaced
+with write-then-rename, and the plan store keeps a per-process read cache
+that is only refreshed when the files on disk change.
+"""
+
+import base64
+import bisect
+import gzip
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines run a single process anyway.
+    fcntl = None
+
+_LOCK_SH = fcntl.LOCK_SH if fcntl is not None else None
+_LOCK_EX = fcntl.LOCK_EX if fcntl is not None else None
+
+
+class FileLock:
+    """Inter-process reader/writer lock on a sidecar file, also thread-safe."""
+
+    def __init__(self, path):
+        self.path = path
+        self.thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    @contextmanager
+    def _hold(self, mode):
+        with self.thread_lock:
+            outermost = self._depth == 0
+            if outermost and fcntl is not None:
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                fcntl.flock(self._fd, mode)
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if outermost and self._fd is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+                    os.close(self._fd)
+                    self._fd = None
+
+    def shared(self):
+        return self._hold(_LOCK_SH)
+
+    def exclusive(self):
+        return self._hold(_LOCK_EX)
+
+
+def atomic_write(path, text):
+    """Replace ``path`` with ``text`` so readers never see a partial file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    tmp_path = os.path.join(directory, f".{os.path.basename(path)}.{os.getpid()}.tmp")
+    with open(tmp_path, "w") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _file_identity(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def _date_key(plan):
+    return str(plan.get("date") or "")
+
+
+def _subject_key(subject):
+    return str(subject or "").strip().casefold()
+
+
+def is_plan_id(value):
+    """True for an integer id; bools are ints in Python but never ids."""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def encode_cursor(date, plan_id):
+    """Opaque pagination cursor for the plan after ``(date, id)``."""
+    raw = json.dumps([date, plan_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Inverse of ``encode_cursor``; raises ValueError for a bad cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        date, plan_id = json.loads(raw)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(date, str) or not is_plan_id(plan_id):
+        raise ValueError("Invalid cursor")
+    return date, plan_id
+
+
+class PlanStore:
+    """Plan list persisted as a snapshot file plus an append-only journal."""
+
+    def __init__(self, path, compact_threshold=1000, compact_interval=30.0,
+                 max_tombstones=10000):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.compact_threshold = compact_threshold
+        self.compact_interval = compact_interval
+        self.max_tombstones = max_tombstones
+        self.lock = FileLock(path + ".lock")
+
+        self._plans = None  # id -> plan, in creation order
+        self._next_id = 0
+        self._by_date = []  # sorted (date, id)
+        self._by_subject = {}  # casefolded subject -> set of ids
+        self._completed = set()
+        self._revision = 0
+        # id -> revision of its last change, oldest first. Ids missing from
+        # ``_plans`` are tombstones. Changes at or below ``_floor`` have
+        # been forgotten.
+        self._changes = {}
+        self._floor = 0
+        self._journal_records = 0
+        # Identity of the files the cache was built from, and how far into
+        # the journal it has replayed. Compaction replaces both files with
+        # new inodes, which forces other processes to reload from scratch.
+        self._snapshot_identity = None
+        self._journal_inode = None
+        self._journal_offset = 0
+        self._compact_wanted = threading.Event()
+        self._compactor = None
+
+    # ---------------- loading ----------------
+
+    def _is_current(self):
+        if self._plans is None:
+            return False
+        if _file_identity(self.path) != self._snapshot_identity:
+            return False
+        journal = _file_identity(self.journal_path)
+        if journal is None:
+            return self._journal_offset == 0
+        return journal[0] == self._journal_inode and journal[2] == self._journal_offset
+
+    def _load(self):
+        """Bring the cache up to date with disk. Caller holds ``self.lock``."""
+        snapshot_identity = _file_identity(self.path)
+        journal = _file_identity(self.journal_path)
+        journal_inode = journal[0] if journal else None
+
+        if (self._plans is None
+                or snapshot_identity != self._snapshot_identity
+                or journal_inode != self._journal_inode
+                or (journal and journal[2] < self._journal_offset)):
+            data = None
+            try:
+                if snapshot_identity is not None:
+                    with open(self.path, "r") as f:
+                        data = json.load(f)
+            except Exception:
+                data = None
+            self._restore(data)
+            self._reindex()
+            self._journal_records = 0
+            self._journal_offset = 0
+            self._snapshot_identity = snapshot_identity
+            self._journal_inode = journal_inode
+
+        if journal and journal[2] > self._journal_offset:
+            self._replay_from(self._journal_offset)
+        return self._plans
+
+    def _restore(self, data):
+        """Reset the in-memory state from a parsed snapshot file."""
+        plans, next_id, revision, changes, floor = {}, 0, 0, {}, 0
+        if isinstance(data, dict):
+            plans = {plan["id"]: plan for plan in data.get("plans", [])
+                     if isinstance(plan, dict) and is_plan_id(plan.get("id"))}
+            next_id = max(data.get("next_id", 0), max(plans, default=-1) + 1)
+            revision = data.get("revision", 0)
+            floor = data.get("floor", 0)
+            listed = dict(data.get("changes", []))
+            # Plans missing from the change list predate it; they go first
+            # to keep the list ordered by revision.
+            changes = {plan_id: floor for plan_id in plans if plan_id not in listed}
+            changes.update(listed)
+        elif isinstance(data, list):
+            # Older files are a bare list whose ids were list positions;
+            # keep those so clients holding them still address the same plan.
+            plans = {i: dict(plan, id=i) for i, plan in enumerate(data) if isinstance(plan, dict)}
+            next_id = revision = len(data)
+            changes = {plan_id: plan_id + 1 for plan_id in plans}
+        self._plans, self._next_id = plans, next_id
+        self._revision, self._changes, self._floor = revision, changes, floor
+
+    # ---------------- secondary indexes ----------------
+
+    def _reindex(self):
+        self._by_date = sorted((_date_key(plan), plan_id) for plan_id, plan in self._plans.items())
+        self._by_subject = {}
+        self._completed = set()
+        for plan_id, plan in self._plans.items():
+            self._by_subject.setdefault(_subject_key(plan.get("subject")), set()).add(plan_id)
+            if plan.get("completed"):
+                self._completed.add(plan_id)
+
+    def _index(self, plan):
+        plan_id = plan["id"]
+        bisect.insort(self._by_date, (_date_key(plan), plan_id))
+        self._by_subject.setdefault(_subject_key(plan.get("subject")), set()).add(plan_id)
+        if plan.get("completed"):
+            self._completed.add(plan_id)
+
+    def _unindex(self, plan):
+        plan_id = plan["id"]
+        entry = (_date_key(plan), plan_id)
+        i = bisect.bisect_left(self._by_date, entry)
+        if i < len(self._by_date) and self._by_date[i] == entry:
+            del self._by_date[i]
+        subject = _subject_key(plan.get("subject"))
+        ids = self._by_subject.get(subject)
+        if ids is not None:
+            ids.discard(plan_id)
+            if not ids:
+                del self._by_subject[subject]
+        self._completed.discard(plan_id)
+
+    def _replay_from(self, offset):
+        with open(self.journal_path, "rb") as f:
+            f.seek(offset)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    # A torn trailing line from a crash mid-append; leave it
+                    # unconsumed so the offset stays on a record boundary.
+                    break
+                offset += len(raw)
+                try:
+                    self._apply(json.loads(raw))
+                except Exception:
+                    continue
+                self._journal_records += 1
+        self._journal_offset = offset
+
+    def _apply(self, record):
+        plans = self._plans
+        op = record.get("op")
+        # Every process replays the same journal, so they all agree on it.
+        self._revision += 1
+        if "index" in record:
+            # Journals written before plans had stable ids address them by
+            # list position.
+            ids = list(plans)
+            if not 0 <= record["index"] < len(ids):
+                return
+            record = dict(record, id=ids[record["index"]])
+        if op == "add":
+            plan = record["plan"]
+            old = plans.get(plan["id"])
+            if old is not None:
+                self._unindex(old)
+            plans[plan["id"]] = plan
+            self._index(plan)
+            self._next_id = max(self._next_id, plan["id"] + 1)
+            self._touch(plan["id"])
+        elif op == "update":
+            plan = plans.get(record["id"])
+            if plan is not None:
+                self._unindex(plan)
+                try:
+                    plan.update(record["data"])
+                finally:
+                    self._index(plan)
+                self._touch(plan["id"])
+        elif op == "delete":
+            plan = plans.pop(record["id"], None)
+            if plan is not None:
+                self._unindex(plan)
+                self._touch(plan["id"])
+
+    def _touch(self, plan_id):
+        self._changes.pop(plan_id, None)
+        self._changes[plan_id] = self._revision
+
+    def _expire_tombstones(self):
+        excess = len(self._changes) - len(self._plans) - self.max_tombstones
+        if excess <= 0:
+            return
+        for plan_id, rev in list(self._changes.items()):
+            if excess <= 0:
+                break
+            if plan_id not in self._plans:
+                del self._changes[plan_id]
+                self._floor = rev
+                excess -= 1
+
+    # ---------------- journal ----------------
+
+    def _append(self, *records):
+        """Append records in a single write. Caller holds the exclusive lock."""
+        if not records:
+            return
+        data = "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in records).encode()
+        with open(self.journal_path, "ab") as f:
+            if f.tell() != self._journal_offset:
+                # Drop a torn tail left by a crashed writer before appending.
+                f.truncate(self._journal_offset)
+            f.write(data)
+            offset = f.tell()
+        if self._journal_inode is None:
+            self._journal_inode = _file_identity(self.journal_path)[0]
+        self._journal_offset = offset
+        self._journal_records += len(records)
+        self._ensure_compactor()
+        if self._journal_records >= self.compact_threshold:
+            self._compact_wanted.set()
+
+    def _ensure_compactor(self):
+        # Started lazily so importing the app (e.g. in a pre-forking server)
+        # does not spawn threads in the parent process.
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(
+            target=self._compact_loop, name="plan-store-compactor", daemon=True
+        )
+        self._compactor.start()
+
+    def _compact_loop(self):
+        while True:
+            self._compact_wanted.wait(self.compact_interval)
+            self._compact_wanted.clear()
+            try:
+                if self._journal_records:
+                    self.compact()
+            except Exception as e:
+                print("Plan compaction error:", str(e))
+
+    def compact(self):
+        """Write the current snapshot to disk and start a fresh journal."""
+        with self.lock.exclusive():
+            plans = self._load()
+            if not self._journal_records and self._snapshot_identity is not None:
+                return
+            self._expire_tombstones()
+            snapshot = {
+                "next_id": self._next_id,
+                "revision": self._revision,
+                "floor": self._floor,
+                "plans": list(plans.values()),
+                "changes": list(self._changes.items()),
+            }
+            atomic_write(self.path, json.dumps(snapshot, separators=(",", ":")))
+            atomic_write(self.journal_path, "")
+            self._snapshot_identity = _file_identity(self.path)
+            self._journal_inode = _file_identity(self.journal_path)[0]
+            self._journal_offset = 0
+            self._journal_records = 0
+
+    # ---------------- public API ----------------
+
+    def _read(self):
+        if self._is_current():
+            return self._plans
+        with self.lock.shared():
+            return self._load()
+
+    def all(self):
+        with self.lock.thread_lock:
+            return [dict(plan) for plan in self._read().values()]
+
+    def revision(self):
+        with self.lock.thread_lock:
+            self._read()
+            return self._revision
+
+    def changes(self, since):
+        """What changed after revision ``since``.
+
+        Returns ``{"revision", "reset", "changes"}``. Each change is
+        ``{"op": "upsert", "plan": plan}`` or ``{"op": "delete", "id": id}``,
+        oldest first. If ``since`` is older than the retained tombstones (or
+        newer than the store, e.g. after it was wiped) ``reset`` is true and
+        the changes are an upsert of every plan: drop local state first.
+        """
+        with self.lock.thread_lock:
+            plans = self._read()
+            if since < self._floor or since > self._revision:
+                return {
+                    "revision": self._revision,
+                    "reset": True,
+                    "changes": [{"op": "upsert", "plan": dict(p)} for p in plans.values()],
+                }
+            changes = []
+            for plan_id, rev in reversed(self._changes.items()):
+                if rev <= since:
+                    break
+                plan = plans.get(plan_id)
+                if plan is None:
+                    changes.append({"op": "delete", "id": plan_id})
+                else:
+                    changes.append({"op": "upsert", "plan": dict(plan)})
+            changes.reverse()
+            return {"revision": self._revision, "reset": False, "changes": changes}
+
+    def get(self, plan_id):
+        with self.lock.thread_lock:
+            plan = self._read().get(plan_id)
+            return dict(plan) if plan is not None else None
+
+    def query(self, date_from=None, date_to=None, subject=None, completed=None,
+              limit=None, after=None):
+        """Plans matching the filters, ordered by ``(date, id)``.
+
+        Dates compare as strings, so ISO ``YYYY-MM-DD`` values sort
+        correctly; both bounds are inclusive. ``subject`` matches ignoring
+        case and surrounding spaces. ``after`` is the ``(date, id)`` of the
+        last plan on the previous page. Returns ``(plans, more)`` where
+        ``more`` tells whether a further page exists.
+        """
+        with self.lock.thread_lock:
+            plans = self._read()
+
+            if subject is not None:
+                ids = self._by_subject.get(_subject_key(subject), ())
+                candidates = sorted((_date_key(plans[i]), i) for i in ids)
+            else:
+                candidates = self._by_date
+            start = 0
+            if after is not None:
+                start = bisect.bisect_right(candidates, tuple(after))
+            if date_from is not None:
+                start = max(start, bisect.bisect_left(candidates, (date_from,)))
+
+            results = []
+            for i in range(start, len(candidates)):
+                date, plan_id = candidates[i]
+                if date_to is not None and date > date_to:
+                    break
+                if completed is not None and (plan_id in self._completed) != completed:
+                    continue
+                if limit is not None and len(results) == limit:
+                    return results, True
+                results.append(dict(plans[plan_id]))
+            return results, False
+
+    def add(self, plan):
+        with self.lock.exclusive():
+            self._load()
+            record = {"op": "add", "plan": dict(plan, id=self._next_id)}
+            self._append(record)
+            self._apply(record)
+            return dict(record["plan"])
+
+    def update(self, plan_id, data):
+        """Merge ``data`` into a plan; return the updated plan or None."""
+        if not isinstance(data, dict):
+            raise ValueError("Plan update must be a JSON object")
+        data = {k: v for k, v in data.items() if k != "id"}
+        with self.lock.exclusive():
+            plans = self._load()
+            if plan_id not in plans:
+                return None
+            record = {"op": "update", "id": plan_id, "data": data}
+            self._append(record)
+            self._apply(record)
+            return dict(plans[plan_id])
+
+    def delete(self, plan_id):
+        with self.lock.exclusive():
+            if plan_id not in self._load():
+                return False
+            record = {"op": "delete", "id": plan_id}
+            self._append(record)
+            self._apply(record)
+            return True
+
+    def apply_batch(self, creates=(), updates=(), deletes=()):
+        """Apply many mutations under one lock with a single journal write.
+
+        ``updates`` is a list of ``(id, data)`` pairs and ``deletes`` a list
+        of ids. Updates run first, then deletes, then creates. Returns
+        per-item results in input order: the created plan for each create,
+        and True/False for the rest.
+        """
+        with self.lock.exclusive():
+            plans = self._load()
+            records = []
+            results = {"create": [], "update": [], "delete": []}
+
+            for plan_id, data in updates:
+                ok = isinstance(data, dict) and plan_id in plans
+                if ok:
+                    data = {k: v for k, v in data.items() if k != "id"}
+                    records.append({"op": "update", "id": plan_id, "data": data})
+                results["update"].append(ok)
+
+            deleted = set()
+            for plan_id in deletes:
+                ok = plan_id in plans and plan_id not in deleted
+                if ok:
+                    deleted.add(plan_id)
+                    records.append({"op": "delete", "id": plan_id})
+                results["delete"].append(ok)
+
+            next_id = self._next_id
+            for plan in creates:
+                plan = dict(plan, id=next_id)
+                next_id += 1
+                records.append({"op": "add", "plan": plan})
+                results["create"].append(dict(plan))
+
+            self._append(*records)
+            for record in records:
+                self._apply(record)
+            return results
+
+
+class SessionStore:
+    """Jas AI conversations, one JSON-lines shard per ``session_id``.
+
+    Next to each shard sits an ``.idx`` file of fixed-width byte offsets, one
+    per message, so a page of messages is read by seeking straight to it
+    instead of scanning the conversation from the start. A message's
+    ``seq`` number, which clients use as a pagination cursor, is its
+    position in the index plus the seq of the first message still kept.
+
+    A background thread enforces retention and compresses cold sessions.
+    Sessions over ``max_messages`` lose their oldest messages, messages older
+    than ``max_age`` seconds are dropped, and a session untouched for that
+    long is deleted outright. When old messages are trimmed the first kept
+    message records its ``seq``, so seq numbers stay stable. A session not
+    written for ``cold_after`` seconds is gzipped to ``<shard>.gz`` and its
+    shard emptied in place, so the file its flock lives on never goes away.
+    Reads decompress cold sessions transparently; the next append thaws them.
+    """
+
+    OFFSET = struct.Struct("<Q")
+
+    def __init__(self, directory, max_messages=None, max_age=None, cold_after=None,
+                 compact_interval=300.0):
+        self.directory = directory
+        self.max_messages = max_messages
+        self.max_age = max_age
+        self.cold_after = cold_after
+        self.compact_interval = compact_interval
+        self.lock = FileLock(os.path.join(directory, ".lock"))
+        self.last_compaction = None
+        self._compactor = None
+        self._compactor_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _shard_path(self, session_id):
+        # Session ids come from clients, so never use them as file names.
+        digest = hashlib.sha1(str(session_id).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest + ".jsonl")
+
+    @staticmethod
+    def _index_path(shard_path):
+        return shard_path[:-len(".jsonl")] + ".idx"
+
+    @staticmethod
+    def _cold_path(shard_path):
+        return shard_path + ".gz"
+
+    @staticmethod
+    def _lock_file(path, mode, lock_mode):
+        """Open ``path`` and flock it, retrying if it was swapped meanwhile.
+
+        Returns None if a reader finds the file gone (the session expired).
+        """
+        while True:
+            try:
+                f = open(path, mode)
+            except FileNotFoundError:
+                if mode != "rb":
+                    raise
+                return None
+            if fcntl is None:
+                return f
+            fcntl.flock(f.fileno(), lock_mode)
+            identity = _file_identity(path)
+            if identity is not None and identity[0] == os.fstat(f.fileno()).st_ino:
+                return f
+            f.close()
+
+    @contextmanager
+    def _open(self, path, exclusive=False):
+        """Yield ``(shard, index, count)`` for a shard under its flock.
+
+        The shard's lock also guards its index and cold copy. If a reader
+        finds the index out of step with the shard (a crash between the two
+        writes, or a shard written before indexes existed) it retries as a
+        writer so the index can be rebuilt.
+        """
+        shard = None
+        if exclusive or os.path.exists(path):
+            shard = self._lock_file(path, "a+b" if exclusive else "rb",
+                                    _LOCK_EX if exclusive else _LOCK_SH)
+        if shard is None:
+            yield None, None, 0
+            return
+
+        try:
+            with open(self._index_path(path), "a+b") as index:
+                count = self._indexed_count(shard, index)
+                if count is None and exclusive:
+                    count = self._rebuild_index(shard, index)
+                if count is not None:
+                    yield shard, index, count
+                    return
+        finally:
+            shard.close()
+
+        with self._open(path, exclusive=True) as opened:
+            yield opened
+
+    def _offsets(self, index, start, stop):
+        index.seek(start * self.OFFSET.size)
+        data = index.read((stop - start) * self.OFFSET.size)
+        return [offset for (offset,) in self.OFFSET.iter_unpack(data)]
+
+    def _indexed_count(self, shard, index):
+        """Number of indexed messages, or None if the index is stale."""
+        data_size = os.fstat(shard.fileno()).st_size
+        index_size = os.fstat(index.fileno()).st_size
+        if index_size % self.OFFSET.size:
+            return None
+        count = index_size // self.OFFSET.size
+        if count == 0:
+            return 0 if data_size == 0 else None
+        last = self._offsets(index, count - 1, count)[0]
+        shard.seek(last)
+        line = shard.readline()
+        if line.endswith(b"\n") and last + len(line) == data_size:
+            return count
+        return None
+
+    def _rebuild_index(self, shard, index):
+        shard.seek(0)
+        offsets = []
+        position = 0
+        for raw in shard:
+            if not raw.endswith(b"\n"):
+                break
+            offsets.append(position)
+            position += len(raw)
+        # Drop a torn tail left by a crashed writer.
+        shard.truncate(position)
+        index.truncate(0)
+        index.write(b"".join(self.OFFSET.pack(o) for o in offsets))
+        index.flush()
+        return len(offsets)
+
+    @staticmethod
+    def _encode(messages, first_seq=0, stamp=True):
+        """JSON lines for ``messages``, stamping new ones with a ``ts``.
+
+        A ``seq`` sent back by a client is dropped; only the first line of a
+        trimmed session stores one, to carry its numbering.
+        """
+        now = time.time()
+        lines = []
+        for i, message in enumerate(messages):
+            if isinstance(message, dict):
+                message = {k: v for k, v in message.items() if k != "seq"}
+                if stamp:
+                    message.setdefault("ts", now)
+                if i == 0 and first_seq:
+                    message["seq"] = first_seq
+            lines.append(json.dumps(message, separators=(",", ":")).encode("utf-8") + b"\n")
+        return lines
+
+    def _write(self, shard, index, lines):
+        position = os.fstat(shard.fileno()).st_size
+        offsets = []
+        for line in lines:
+            offsets.append(position)
+            position += len(line)
+        shard.write(b"".join(lines))
+        shard.flush()
+        index.write(b"".join(self.OFFSET.pack(o) for o in offsets))
+        index.flush()
+
+    @staticmethod
+    def _seq_of(raw):
+        try:
+            message = json.loads(raw)
+        except ValueError:
+            return 0
+        return message.get("seq", 0) if isinstance(message, dict) else 0
+
+    def _first_seq(self, shard):
+        shard.seek(0)
+        return self._seq_of(shard.readline())
+
+    # ---------------- cold sessions ----------------
+
+    def _cold_lines(self, path):
+        """Message lines of a gzipped session, or [] if it has none."""
+        try:
+            with gzip.open(self._cold_path(path), "rb") as f:
+                return f.read().split(b"\n")[:-1]
+        except FileNotFoundError:
+            return []
+
+    def _thaw(self, path, shard, index):
+        """Move a cold session back into its shard. Caller holds its lock."""
+        lines = self._cold_lines(path)
+        if lines:
+            self._write(shard, index, [line + b"\n" for line in lines])
+        _remove(self._cold_path(path))
+        return len(lines)
+
+    def _freeze(self, path, shard, index, last_write):
+        shard.seek(0)
+        data = shard.read()
+        cold_path = self._cold_path(path)
+        tmp_path = f"{cold_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                f.write(data)
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp_path, cold_path)
+        # Keep the session's age measured from its last message.
+        os.utime(cold_path, (last_write, last_write))
+        # A crash before this point leaves the shard intact, and a non-empty
+        # shard always wins over its cold copy.
+        shard.truncate(0)
+        index.truncate(0)
+
+    # ---------------- public API ----------------
+
+    def append(self, session_id, messages):
+        """Append ``messages`` in a single write; returns the first new seq."""
+        if not session_id or not messages:
+            return None
+        path = self._shard_path(session_id)
+        with self._open(path, exclusive=True) as (shard, index, count):
+            if count == 0:
+                count = self._thaw(path, shard, index)
+            first = self._first_seq(shard) if count else 0
+            self._write(shard, index, self._encode(messages))
+        self._ensure_compactor()
+        return first + count
+
+    def replace(self, session_id, messages):
+        """Overwrite a session's history with ``messages``."""
+        path = self._shard_path(session_id)
+        with self._open(path, exclusive=True) as (shard, index, count):
+            shard.truncate(0)
+            index.truncate(0)
+            _remove(self._cold_path(path))
+            self._write(shard, index, self._encode(messages))
+        self._ensure_compactor()
+
+    def messages(self, session_id):
+        path = self._shard_path(session_id)
+        with self._open(path) as (shard, index, count):
+            if count:
+                shard.seek(0)
+                lines = shard.read().split(b"\n")[:count]
+            else:
+                lines = self._cold_lines(path)
+        messages = [json.loads(raw) for raw in lines]
+        if messages and isinstance(messages[0], dict):
+            messages[0].pop("seq", None)
+        return messages
+
+    def page(self, session_id, limit=50, before=None, after=None):
+        """Read at most ``limit`` messages around a ``seq`` cursor.
+
+        With ``after`` the page starts just past that seq; with ``before`` it
+        ends just short of it; with neither it is the tail of the session.
+        Returns ``(messages, total, first_seq)`` where each message carries
+        its ``seq``, ``total`` is one past the last seq and ``first_seq`` is
+        the oldest seq retention has kept. Cost is proportional to the page,
+        not the conversation, except for cold sessions which are read whole.
+        """
+        path = self._shard_path(session_id)
+        with self._open(path) as (shard, index, count):
+            cold_lines = None
+            if count:
+                first = self._first_seq(shard)
+            else:
+                cold_lines = self._cold_lines(path)
+                count = len(cold_lines)
+                first = self._seq_of(cold_lines[0]) if cold_lines else 0
+
+            if after is not None:
+                start = max(after + 1 - first, 0)
+                stop = min(start + limit, count)
+            else:
+                stop = count if before is None else max(0, min(before - first, count))
+                start = max(stop - limit, 0)
+            if start >= stop:
+                return [], first + count, first
+
+            if cold_lines is not None:
+                lines = cold_lines[start:stop]
+            else:
+                offsets = self._offsets(index, start, min(stop + 1, count))
+                end = offsets[-1] if stop < count else os.fstat(shard.fileno()).st_size
+                shard.seek(offsets[0])
+                lines = shard.read(end - offsets[0]).split(b"\n")[:stop - start]
+
+            messages = []
+            for seq, raw in enumerate(lines, first + start):
+                message = json.loads(raw)
+                if not isinstance(message, dict):
+                    # Written before non-object messages were rejected
+                    message = {"text": message}
+                message["seq"] = seq
+                messages.append(message)
+            return messages, first + count, first
+
+    def import_legacy(self, path):
+        """One-off migration of a monolithic ``{session_id: [messages]}`` file."""
+        with self.lock.exclusive():
+            if not os.path.exists(path):
+                return 0
+            try:
+                with open(path, "r") as f:
+                    sessions = json.load(f) or {}
+            except Exception:
+                return 0
+            for session_id, messages in sessions.items():
+                if isinstance(messages, list):
+                    self.append(session_id, messages)
+            os.replace(path, path + ".migrated")
+            return len(sessions)
+
+    # ---------------- retention and compaction ----------------
+
+    def _ensure_compactor(self):
+        # Started lazily, like the plan store's, so a pre-forking server's
+        # parent process never runs it.
+        if not (self.max_messages or self.max_age or self.cold_after):
+            return
+        with self._compactor_lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            self._compactor = threading.Thread(
+                target=self._compact_loop, name="session-store-compactor", daemon=True
+            )
+            self._compactor.start()
+
+    def _compact_loop(self):
+        while True:
+            time.sleep(self.compact_interval)
+            try:
+                self.compact()
+            except Exception as e:
+                print("Session compaction error:", str(e))
+
+    def compact(self):
+        """Apply retention to every session and compress cold ones.
+
+        Each session is handled under its own lock, so chats carry on while
+        this runs. Returns counts of trimmed, deleted and frozen sessions.
+        """
+        stats = {"trimmed": 0, "deleted": 0, "frozen": 0}
+        now = time.time()
+        for name in os.listdir(self.directory):
+            if not name.endswith(".jsonl"):
+                continue
+            try:
+                outcome = self._compact_shard(os.path.join(self.directory, name), now)
+            except FileNotFoundError:
+                continue
+            if outcome:
+                stats[outcome] += 1
+        self.last_compaction = dict(stats, at=now)
+        return stats
+
+    def _compact_shard(self, path, now):
+        with self._open(path, exclusive=True) as (shard, index, count):
+            cold_path = self._cold_path(path)
+            cold = count == 0 and os.path.exists(cold_path)
+            if count == 0 and not cold:
+                self._delete(path)
+                return None
+            if not cold:
+                # Left behind by a crash mid-freeze; the shard is newer.
+                _remove(cold_path)
+
+            last_write = os.path.getmtime(cold_path if cold else path)
+            if self.max_age and last_write < now - self.max_age:
+                self._delete(path)
+                return "deleted"
+            if cold:
+                return None
+
+            trimmed = self._trim(shard, index, count, now)
+            if trimmed:
+                count = self._indexed_count(shard, index)
+            if self.cold_after and count and last_write < now - self.cold_after:
+                self._freeze(path, shard, index, last_write)
+                return "frozen"
+            return "trimmed" if trimmed else None
+
+    def _trim(self, shard, index, count, now):
+        """Drop messages beyond the retention limits; True if any were."""
+        cutoff = now - self.max_age if self.max_age else None
+        over = bool(self.max_messages) and count > self.max_messages
+        if not over and cutoff is not None:
+            shard.seek(0)
+            first = json.loads(shard.readline())
+            over = isinstance(first, dict) and first.get("ts", cutoff) < cutoff
+        if not over:
+            return False
+
+        shard.seek(0)
+        lines = shard.read().split(b"\n")[:count]
+        messages = [json.loads(raw) for raw in lines]
+        first_seq = self._seq_of(lines[0])
+        drop = count - self.max_messages if self.max_messages and count > self.max_messages else 0
+        if cutoff is not None:
+            # Messages stored before timestamps existed have no ts; keep
+            # them until the count limit or the whole session expires.
+            while (drop < count and isinstance(messages[drop], dict)
+                   and messages[drop].get("ts", cutoff) < cutoff):
+                drop += 1
+        shard.truncate(0)
+        index.truncate(0)
+        self._write(shard, index, self._encode(messages[drop:], first_seq + drop, stamp=False))
+        return True
+
+    def _delete(self, path):
+        """Remove a session's files. Caller holds the shard's lock; anyone
+        waiting on it sees the inode vanish and reopens."""
+        for p in (self._cold_path(path), self._index_path(path), path):
+            _remove(p)
+
+    def stats(self):
+        return {
+            "max_messages": self.max_messages,
+            "max_age": self.max_age,
+            "cold_after": self.cold_after,
+            "last_compaction": self.last_compaction,
+        }
+
+
+def _benchmark(sizes=(1000, 10000, 50000), writes=200):
+    """Compare per-write cost of the journal store against a full rewrite."""
+    import tempfile
+
+    def rewrite_all(path, plans):
+        with open(path, "w") as f:
+            json.dump(plans, f, indent=2)
+
+    print(f"{'plans':>8} {'journal us/write':>18} {'rewrite us/write':>18}")
+    for size in sizes:
+        seed = [
+            {"id": i, "subject": "maths", "hours": 1.0, "date": "2026-01-01", "completed": False}
+            for i in range(size)
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "plans.json")
+            rewrite_all(path, seed)
+            store = PlanStore(path, compact_threshold=writes * 10, compact_interval=3600)
+            store.all()  # load outside the timed loop
+
+            start = time.perf_counter()
+            for i in range(writes):
+                store.add({"subject": "physics", "hours": 2.0, "date": "2026-01-02", "completed": False})
+            journal_us = (time.perf_counter() - start) / writes * 1e6
+
+            plans = list(seed)
+            start = time.perf_counter()
+            for i in range(writes):
+                plans.append({"id": len(plans), "subject": "physics", "hours": 2.0,
+                              "date": "2026-01-02", "completed": False})
+                rewrite_all(path + ".full", plans)
+            rewrite_us = (time.perf_counter() - start) / writes * 1e6
+
+        print(f"{size:>8} {journal_us:>18.1f} {rewrite_us:>18.1f}")
+
+
+if __name__ == "__main__":
+    _benchmark()
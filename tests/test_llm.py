@@ -0,0 +1,77 @@
+"""LLMClient against a local stand-in for the chat completions endpoint."""
+
+import http.server
+import json
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm import LLMClient  # noqa: E402
+
+
+class _Upstream(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    delay = 0.3  # A slow, but not timed-out, upstream reply
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        time.sleep(self.delay)
+        body = json.dumps({"choices": [{"message": {"content": "42"}}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class CoalescingTest(unittest.TestCase):
+    def setUp(self):
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Upstream)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.client = LLMClient("key", base_url=f"http://127.0.0.1:{self.server.server_port}",
+                                timeout=0.5, max_in_flight=1)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_follower_waits_for_leader_queued_behind_a_busy_slot(self):
+        messages = [{"role": "user", "content": "What is 6 x 7?"}]
+        results, errors = {}, {}
+
+        def ask(name):
+            try:
+                results[name] = self.client.complete(messages, key="q")
+            except Exception as e:
+                errors[name] = e
+
+        # Saturate the only slot so the leader queues for most of its timeout,
+        # then spends most of it again on the upstream call
+        self.client._slots.acquire()
+        leader = threading.Thread(target=ask, args=("leader",))
+        leader.start()
+        while not self.client._calls:
+            time.sleep(0.01)
+        follower = threading.Thread(target=ask, args=("follower",))
+        follower.start()
+
+        time.sleep(0.4)
+        self.client._slots.release()
+        leader.join()
+        follower.join()
+
+        self.assertEqual(errors, {})
+        self.assertEqual(results, {"leader": "42", "follower": "42"})
+        self.assertEqual(self.client.upstream_calls, 1)
+        self.assertEqual(self.client.coalesced, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()